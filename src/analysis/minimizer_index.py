@@ -0,0 +1,252 @@
+import json
+from pathlib import Path
+from threading import Lock
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from analysis.msa import ALPHABET, encode, pairwise_identity
+from models.organism import Organism
+from storage import workspace
+
+K = 5
+WINDOW = 8
+# residues are encoded as by the aligner (analysis.msa.encode): amino acids below _OTHER, everything else at or above it
+_OTHER = len(ALPHABET)
+_SEPARATOR = _OTHER + 1
+_INVALID = np.uint32(0xFFFFFFFF)
+
+def read_fasta(path):
+    """
+    Yields the records of a (plain) FASTA file.
+
+    Args:
+        path (str | Path): FASTA path.
+
+    Yields:
+        tuple: (accession, sequence). UniProt headers (sp|P12345|NAME_HUMAN) give the accession.
+    """
+    accession, chunks = None, []
+    with open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if line.startswith(">"):
+                if accession is not None:
+                    yield (accession, "".join(chunks))
+                header = line[1:].split()[0] if len(line) > 1 else ""
+                parts = header.split("|")
+                accession, chunks = (parts[1] if len(parts) >= 3 else header), []
+            elif line:
+                chunks.append(line)
+    if accession is not None:
+        yield (accession, "".join(chunks))
+
+def minimizers(codes: np.ndarray, k: int = K, window: int = WINDOW) -> tuple:
+    """
+    Computes the (k, window) minimizers of encoded residues: of every window consecutive k-mers, the one
+    with the smallest hash. k-mers containing unknown residues or a separator are never chosen.
+
+    Args:
+        codes (np.ndarray): Residue codes (see analysis.msa.encode).
+        k (int): k-mer length.
+        window (int): k-mers per window.
+
+    Returns:
+        tuple: (minimizer hashes, start positions of the minimizer k-mers).
+    """
+    if codes.size < k + window - 1:
+        return (np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.int64))
+
+    kmers = sliding_window_view(codes, k)
+    values = kmers.astype(np.uint64) @ (np.uint64(len(ALPHABET)) ** np.arange(k - 1, -1, -1, dtype=np.uint64))
+    # multiplicative hashing, so minimizers are not biased towards alphabetically small k-mers
+    hashes = ((values * np.uint64(0x9E3779B1)) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    hashes[kmers.max(axis=1) >= _OTHER] = _INVALID
+
+    positions = np.arange(hashes.size - window + 1) + sliding_window_view(hashes, window).argmin(axis=1)
+    positions = np.unique(positions)
+    positions = positions[hashes[positions] != _INVALID]
+    return (hashes[positions], positions)
+
+class MinimizerIndex():
+    """
+    Represents a minimizer index over one organism's proteome. Postings are stored CSR-style in flat
+    numpy arrays: for keys[i], the sequences containing it are postings[offsets[i]:offsets[i + 1]].
+    Saved indexes are memory-mapped, so loading one costs almost nothing.
+
+    Attributes:
+        accessions (np.ndarray): Accession per sequence.
+        residues (np.ndarray): All sequences, concatenated, as ASCII bytes.
+        seq_offsets (np.ndarray): Start of each sequence in residues (plus the end).
+        keys (np.ndarray): Sorted distinct minimizer hashes.
+        offsets (np.ndarray): Start of each key's postings (plus the end).
+        postings (np.ndarray): Sequence indices.
+        counts (np.ndarray): Distinct minimizers per sequence.
+    """
+    FILES = ("accessions", "residues", "seq_offsets", "keys", "offsets", "postings", "counts")
+
+    def __init__(self, **arrays):
+        """
+        Constructor for MinimizerIndex.
+
+        Args:
+            **arrays (np.ndarray): The arrays listed in FILES.
+        """
+        for name in self.FILES:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, records) -> "MinimizerIndex":
+        """
+        Builds an index with one vectorized pass over the whole proteome.
+
+        Args:
+            records (iterable): (accession, sequence) pairs.
+
+        Returns:
+            MinimizerIndex: New index.
+        """
+        accessions, sequences = [], []
+        for accession, sequence in records:
+            accessions.append(accession)
+            sequences.append(sequence.upper())
+
+        lengths = np.array([len(s) for s in sequences], dtype=np.int64)
+        residues = np.frombuffer("".join(sequences).encode("ascii", "replace"), dtype=np.uint8)
+        seq_offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+        # sequences are joined with a separator so no k-mer spans two of them
+        codes = encode("\0".join(sequences))
+        codes[seq_offsets[1:-1] + np.arange(len(sequences) - 1)] = _SEPARATOR
+        hashes, positions = minimizers(codes)
+        # sequence i ends at seq_offsets[i + 1] + i in the joined string
+        seq_of = np.searchsorted(seq_offsets[1:] + np.arange(len(sequences)), positions, side="right")
+
+        pairs = np.unique((hashes.astype(np.uint64) << np.uint64(32)) | seq_of.astype(np.uint64))
+        pair_keys = (pairs >> np.uint64(32)).astype(np.uint32)
+        postings = (pairs & np.uint64(0xFFFFFFFF)).astype(np.int32)
+        keys, starts = np.unique(pair_keys, return_index=True)
+
+        return cls(accessions=np.array(accessions, dtype=str), residues=residues, seq_offsets=seq_offsets, keys=keys,
+                   offsets=np.concatenate((starts, [postings.size])).astype(np.int64), postings=postings,
+                   counts=np.bincount(postings, minlength=len(sequences)).astype(np.int32))
+
+    def save(self, directory):
+        """
+        Writes the index as one .npy file per array.
+
+        Args:
+            directory (str | Path): Index directory.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.FILES:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        (directory / "meta.json").write_text(json.dumps({"k": K, "window": WINDOW, "sequences": int(self.counts.size)}))
+
+    @classmethod
+    def load(cls, directory) -> "MinimizerIndex":
+        """
+        Memory-maps a saved index.
+
+        Args:
+            directory (str | Path): Index directory.
+
+        Returns:
+            MinimizerIndex: Loaded index.
+        """
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text())
+        if (meta["k"], meta["window"]) != (K, WINDOW):
+            raise ValueError(f"Index {directory} was built with k={meta['k']}, window={meta['window']}; rebuild it")
+        return cls(**{name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in cls.FILES})
+
+    def sequence(self, index: int) -> str:
+        return bytes(self.residues[self.seq_offsets[index]:self.seq_offsets[index + 1]]).decode("ascii")
+
+    def candidates(self, query: str, top: int = 10) -> list:
+        """
+        Ranks indexed sequences by the fraction of the query's minimizers they share.
+
+        Args:
+            query (str): Query sequence.
+            top (int): Number of candidates returned.
+
+        Returns:
+            list: (accession, sequence index, shared minimizer fraction) tuples, best first.
+        """
+        hashes = np.unique(minimizers(encode(query.upper()))[0])
+        if hashes.size == 0 or self.keys.size == 0:
+            return []
+
+        found = np.minimum(np.searchsorted(self.keys, hashes), self.keys.size - 1)
+        found = found[self.keys[found] == hashes]
+        if found.size == 0:
+            return []
+        starts, ends = self.offsets[found], self.offsets[found + 1]
+
+        # gather every posting list of the matched keys without a Python loop
+        sizes = ends - starts
+        gather = np.repeat(starts - np.concatenate(([0], np.cumsum(sizes)[:-1])), sizes) + np.arange(sizes.sum())
+        hits = np.bincount(self.postings[gather], minlength=self.counts.size)
+
+        scores = hits / np.maximum(np.minimum(self.counts, hashes.size), 1)
+        top = min(top, scores.size)
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [(str(self.accessions[i]), int(i), float(scores[i])) for i in best if hits[i]]
+
+    def rank(self, query: str, top: int = 3, prefilter: int = 10) -> list:
+        """
+        Ranks candidate orthologs: the best prefilter candidates by shared minimizers are all aligned to the
+        query, and the top by alignment identity are kept.
+
+        Args:
+            query (str): Query sequence.
+            top (int): Candidates returned.
+            prefilter (int): Candidates from the minimizer ranking that are aligned.
+
+        Returns:
+            list: (accession, identity, minimizer score) tuples, best first.
+        """
+        ranked = [(accession, pairwise_identity(query, self.sequence(index)), score)
+                  for accession, index, score in self.candidates(query, prefilter)]
+        return sorted(ranked, key=lambda x: (x[1], x[2]), reverse=True)[:top]
+
+def index_dir(organism: Organism) -> Path:
+    return workspace.current().root / "proteome_index" / organism.name
+
+_indexes = {}
+_indexes_lock = Lock()
+
+def load(organism: Organism) -> MinimizerIndex | None:
+    """
+    Gets the saved proteome index of an organism under the current output root, loaded once per process.
+
+    Args:
+        organism (Organism): Panel organism.
+
+    Returns:
+        MinimizerIndex: Index, or None if the organism has not been indexed.
+    """
+    directory = index_dir(organism)
+    with _indexes_lock:
+        if directory not in _indexes:
+            _indexes[directory] = MinimizerIndex.load(directory) if (directory / "meta.json").exists() else None
+        return _indexes[directory]
+
+def build(organism: Organism, fasta_path) -> MinimizerIndex:
+    """
+    Indexes an organism's proteome FASTA and saves the index under the current output root.
+
+    Args:
+        organism (Organism): Panel organism.
+        fasta_path (str | Path): Proteome FASTA.
+
+    Returns:
+        MinimizerIndex: New index.
+    """
+    index = MinimizerIndex.build(read_fasta(fasta_path))
+    directory = index_dir(organism)
+    index.save(directory)
+    with _indexes_lock:
+        _indexes.pop(directory, None)
+    return index
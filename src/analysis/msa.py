@@ -0,0 +1,443 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+import numpy as np
+
+ALPHABET = "ACDEFGHIKLMNPQRSTVWY"
+# residue codes: 0-19 amino acids, 20 anything else, 21 gap
+_OTHER, _GAP = 20, 21
+_CODES = np.full(256, _OTHER, dtype=np.uint8)
+for _i, _aa in enumerate(ALPHABET):
+    _CODES[ord(_aa)] = _CODES[ord(_aa.lower())] = _i
+_CODES[ord("-")] = _CODES[ord(".")] = _GAP
+_SYMBOLS = np.frombuffer((ALPHABET + "X-").encode("ascii"), dtype=np.uint8)
+
+_BLOSUM62_ORDER = "ARNDCQEGHILKMFPSTWYV"
+_BLOSUM62 = """
+ 4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0
+-1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3
+-2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3
+-2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3
+ 0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1
+-1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2
+-1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2
+ 0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3
+-2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3
+-1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3
+-1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1
+-1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2
+-1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1
+-2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1
+-1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2
+ 1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2
+ 0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0
+-3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3
+-2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1
+ 0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4
+"""
+
+def _substitution_matrix() -> np.ndarray:
+    blosum = np.array(_BLOSUM62.split(), dtype=np.float64).reshape(20, 20)
+    order = [_BLOSUM62_ORDER.index(aa) for aa in ALPHABET]
+    scores = np.full((21, 21), -1.0)
+    scores[:20, :20] = blosum[np.ix_(order, order)]
+    return scores
+
+SCORES = _substitution_matrix()
+GAP_OPEN = 11.0
+GAP_EXTEND = 1.0
+_NEG = -1e12
+# traceback flags of align_profiles
+_G_UP, _H_LEFT, _F_EXT, _E_EXT = 1, 2, 4, 8
+
+# Clustal consensus groups: ":" if a column's residues all fall in one strong group, "." for a weak group
+STRONG_GROUPS = ("STA", "NEQK", "NHQK", "NDEQ", "QHRK", "MILV", "MILF", "HY", "FYW")
+WEAK_GROUPS = ("CSA", "ATV", "SAG", "STNK", "STPA", "SGND", "SNDEQK", "NDEQHK", "NEQHRK", "FVLIM", "HFY")
+
+def encode(sequence: str) -> np.ndarray:
+    return _CODES[np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)]
+
+def decode(codes: np.ndarray) -> str:
+    return _SYMBOLS[codes].tobytes().decode("ascii")
+
+def profile(rows: np.ndarray) -> np.ndarray:
+    """
+    Gets the residue frequencies of every column of aligned sequences. Gaps are left out, so a column's
+    frequencies sum to its residue occupancy.
+
+    Args:
+        rows (np.ndarray): Aligned residue codes, one row per sequence.
+
+    Returns:
+        np.ndarray: (columns, 21) frequencies of the amino acids and X.
+    """
+    counts = np.zeros((rows.shape[1], _GAP + 1))
+    np.add.at(counts, (np.broadcast_to(np.arange(rows.shape[1]), rows.shape), rows), 1)
+    return counts[:, :_GAP] / rows.shape[0]
+
+def align_profiles(a: np.ndarray, b: np.ndarray, gap_open: float = GAP_OPEN, gap_extend: float = GAP_EXTEND) -> tuple:
+    """
+    Globally aligns two profiles with affine gaps (Gotoh), scoring columns by sum-of-pairs over SCORES.
+    The recurrences are evaluated a row at a time: horizontal gaps depend on the cells to their left,
+    which is solved for a whole row at once with a running maximum.
+
+    Args:
+        a (np.ndarray): (n, 21) profile, see profile.
+        b (np.ndarray): (m, 21) profile.
+        gap_open (float): Cost of a gap's first position.
+        gap_extend (float): Cost of every further position.
+
+    Returns:
+        tuple: (columns of a, columns of b) per alignment column, -1 where that side has a gap.
+    """
+    n, m = a.shape[0], b.shape[0]
+    # column scores are computed a row at a time; a full (n, m) score matrix would not fit for long proteins
+    scores_b = SCORES @ b.T
+    o, e = gap_open, gap_extend
+    steps = np.arange(m + 1) * e
+
+    # traceback flags, one byte per cell
+    flags = np.zeros((n + 1, m + 1), dtype=np.uint8)
+
+    h_prev = np.concatenate(([0.0], -(o + steps[:-1])))
+    f_prev = np.full(m + 1, _NEG)
+    for i in range(1, n + 1):
+        f_open, f_extend = h_prev - o, f_prev - e
+        f = np.maximum(f_open, f_extend)
+        row = (f_extend > f_open).view(np.uint8) * np.uint8(_F_EXT)
+
+        g = np.empty(m + 1)
+        g[0] = -(o + (i - 1) * e)
+        diag = h_prev[:-1] + a[i - 1] @ scores_b
+        g[1:] = np.maximum(diag, f[1:])
+        row[1:] |= (f[1:] > diag).view(np.uint8)
+
+        # E[j] = max over k < j of G[k] - o - (j - 1 - k) * e; opening from a horizontal gap never beats extending it
+        shifted = g + steps
+        best = np.maximum.accumulate(shifted)
+        left = np.full(m + 1, _NEG)
+        left[1:] = best[:-1] - o - steps[:-1]
+        row[1:] |= (shifted[:-1] < best[:-1]).view(np.uint8) * np.uint8(_E_EXT)
+
+        h = np.maximum(g, left)
+        row |= (left > g).view(np.uint8) * np.uint8(_H_LEFT)
+        flags[i] = row
+        h_prev, f_prev = h, f
+
+    cols_a, cols_b = [], []
+    i, j, state = n, m, "H"
+    while i > 0 and j > 0:
+        cell = flags[i, j]
+        if state == "H":
+            state = "E" if cell & _H_LEFT else "G"
+        elif state == "G":
+            if cell & _G_UP:
+                state = "F"
+            else:
+                i, j, state = i - 1, j - 1, "H"
+                cols_a.append(i)
+                cols_b.append(j)
+        elif state == "F":
+            state = "F" if cell & _F_EXT else "H"
+            i -= 1
+            cols_a.append(i)
+            cols_b.append(-1)
+        else:
+            state = "E" if cell & _E_EXT else "G"
+            j -= 1
+            cols_a.append(-1)
+            cols_b.append(j)
+    cols_a += list(range(i - 1, -1, -1)) + [-1] * j
+    cols_b += [-1] * i + list(range(j - 1, -1, -1))
+    return (np.array(cols_a[::-1], dtype=np.int64), np.array(cols_b[::-1], dtype=np.int64))
+
+def _gapped(rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    out = np.full((rows.shape[0], cols.size), _GAP, dtype=np.uint8)
+    present = cols >= 0
+    out[:, present] = rows[:, cols[present]]
+    return out
+
+def _pair_identity(x: np.ndarray, y: np.ndarray) -> float:
+    """
+    Identical positions over alignment length, ignoring columns where both rows are gaps.
+    """
+    columns = (x != _GAP) | (y != _GAP)
+    if not columns.any():
+        return 0.0
+    return float(((x == y) & (x != _GAP)).sum() / columns.sum())
+
+def pairwise_identity(seq_a: str, seq_b: str) -> float:
+    """
+    Global alignment identity of two sequences, aligned with align_profiles.
+
+    Args:
+        seq_a (str): First sequence.
+        seq_b (str): Second sequence.
+
+    Returns:
+        float: Identical positions over alignment length, in [0, 1].
+    """
+    if not seq_a or not seq_b:
+        return 0.0
+    a, b = encode(seq_a.upper())[None, :], encode(seq_b.upper())[None, :]
+    cols_a, cols_b = align_profiles(profile(a), profile(b))
+    return _pair_identity(_gapped(a, cols_a)[0], _gapped(b, cols_b)[0])
+
+def _distance_row(sequences: list, i: int) -> np.ndarray:
+    """
+    Distances (1 - pairwise alignment identity) of sequence i to every later sequence. Top level, so it
+    can run in a process pool.
+    """
+    distances = np.zeros(len(sequences))
+    for j in range(i + 1, len(sequences)):
+        distances[j] = 1.0 - pairwise_identity(sequences[i], sequences[j])
+    return distances
+
+def pairwise_distances(sequences: list, executor=None) -> np.ndarray:
+    """
+    Aligns every pair of sequences, one task per sequence against all later ones.
+
+    Args:
+        sequences (list): Amino acid sequences.
+        executor (Executor): Pool to spread the tasks over, None to run them here.
+
+    Returns:
+        np.ndarray: Symmetric matrix of 1 - alignment identity.
+    """
+    n = len(sequences)
+    rows = (executor.map(_distance_row, [sequences] * (n - 1), range(n - 1)) if executor
+            else (_distance_row(sequences, i) for i in range(n - 1)))
+    distances = np.zeros((n, n))
+    for i, row in enumerate(rows):
+        distances[i] = row
+    return distances + distances.T
+
+def guide_tree(distances: np.ndarray) -> list:
+    """
+    Builds a UPGMA guide tree.
+
+    Args:
+        distances (np.ndarray): Symmetric distance matrix.
+
+    Returns:
+        list: Merges in order, as (cluster, cluster) pairs; clusters 0..n-1 are the sequences and
+        merge k creates cluster n + k.
+    """
+    n = distances.shape[0]
+    d = distances.astype(np.float64).copy()
+    np.fill_diagonal(d, np.inf)
+    sizes = {i: 1 for i in range(n)}
+    ids = list(range(n))
+    merges = []
+    for k in range(n - 1):
+        x, y = np.unravel_index(np.argmin(d), d.shape)
+        x, y = min(x, y), max(x, y)
+        a, b = ids[x], ids[y]
+        merges.append((a, b))
+        size_a, size_b = sizes.pop(a), sizes.pop(b)
+        merged = (d[x] * size_a + d[y] * size_b) / (size_a + size_b)
+        d[x], d[:, x] = merged, merged
+        d[x, x] = np.inf
+        d[y], d[:, y] = np.inf, np.inf
+        ids[x] = n + k
+        sizes[n + k] = size_a + size_b
+    return merges
+
+class Alignment():
+    """
+    Represents a multiple sequence alignment.
+
+    Attributes:
+        names (list): Sequence names.
+        rows (np.ndarray): Aligned residue codes, one row per sequence (see encode).
+        distances (np.ndarray): Pairwise distances the guide tree was built from, or None for a read alignment.
+    """
+    names: list
+    rows: np.ndarray
+    distances: np.ndarray | None
+
+    def __init__(self, names: list, rows: np.ndarray, distances: np.ndarray | None = None):
+        """
+        Constructor for Alignment.
+
+        Args:
+            names (list): Sequence names.
+            rows (np.ndarray): Aligned residue codes.
+            distances (np.ndarray): Pairwise distances.
+        """
+        self.names = list(names)
+        self.rows = rows
+        self.distances = distances
+
+    @property
+    def sequences(self) -> list:
+        return [decode(row) for row in self.rows]
+
+    def identity(self, i: int, j: int) -> float:
+        """
+        Gets the identity of two sequences in this alignment.
+
+        Args:
+            i (int): Row of the first sequence.
+            j (int): Row of the second sequence.
+
+        Returns:
+            float: Identical positions over the columns where either has a residue, in [0, 1].
+        """
+        return _pair_identity(self.rows[i], self.rows[j])
+
+    def conservation(self) -> np.ndarray:
+        """
+        Scores every column by how conserved it is: one minus the Shannon entropy of its residues
+        (normalised to [0, 1] over the 20 amino acids), scaled by the fraction of sequences with a residue.
+
+        Returns:
+            np.ndarray: Conservation per column, 1 for a column of one amino acid without gaps.
+        """
+        frequencies = profile(self.rows)
+        occupancy = frequencies.sum(axis=1)
+        p = frequencies / np.maximum(occupancy, 1e-12)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            entropy = -np.where(p > 0, p * np.log(p), 0.0).sum(axis=1) / np.log(20)
+        return np.clip(1.0 - entropy, 0.0, 1.0) * occupancy
+
+    def consensus_line(self) -> str:
+        """
+        Gets the Clustal consensus line: "*" for identical columns, ":" and "." for columns within a strong or weak group.
+        """
+        symbols = []
+        for column in self.rows.T:
+            residues = set(decode(column))
+            if "-" in residues or "X" in residues:
+                symbols.append(" ")
+            elif len(residues) == 1:
+                symbols.append("*")
+            elif any(residues <= set(group) for group in STRONG_GROUPS):
+                symbols.append(":")
+            elif any(residues <= set(group) for group in WEAK_GROUPS):
+                symbols.append(".")
+            else:
+                symbols.append(" ")
+        return "".join(symbols)
+
+    def to_fasta(self, width: int = 60) -> str:
+        lines = []
+        for name, sequence in zip(self.names, self.sequences):
+            lines.append(f">{name}")
+            lines.extend(sequence[i:i + width] for i in range(0, len(sequence), width))
+        return "\n".join(lines) + "\n"
+
+    def to_clustal(self, width: int = 60) -> str:
+        pad = max(len(name) for name in self.names) + 4
+        sequences, consensus = self.sequences, self.consensus_line()
+        counts = [0] * len(sequences)
+        lines = ["CLUSTAL multiple sequence alignment", "", ""]
+        for start in range(0, self.rows.shape[1], width):
+            for k, (name, sequence) in enumerate(zip(self.names, sequences)):
+                chunk = sequence[start:start + width]
+                counts[k] += len(chunk) - chunk.count("-")
+                lines.append(f"{name:<{pad}}{chunk} {counts[k]}")
+            lines.append(" " * pad + consensus[start:start + width])
+            lines.append("")
+        return "\n".join(lines)
+
+    def write(self, path) -> str:
+        """
+        Writes this alignment as Clustal (.aln, .clustal) or aligned FASTA (any other suffix).
+
+        Args:
+            path (str | Path): Output path.
+
+        Returns:
+            str: Output path.
+        """
+        path = Path(path)
+        path.write_text(self.to_clustal() if path.suffix in (".aln", ".clustal") else self.to_fasta())
+        return str(path)
+
+    @classmethod
+    def read(cls, path) -> "Alignment":
+        """
+        Reads an aligned FASTA file.
+
+        Args:
+            path (str | Path): Aligned FASTA path.
+
+        Returns:
+            Alignment: Alignment.
+        """
+        names, sequences = [], []
+        for line in Path(path).read_text().splitlines():
+            if line.startswith(">"):
+                names.append(line[1:].strip())
+                sequences.append([])
+            elif line.strip():
+                sequences[-1].append(line.strip())
+        return cls(names, np.stack([encode("".join(chunks)) for chunks in sequences]))
+
+def align(names: list, sequences: list, executor=None, max_workers: int | None = None) -> Alignment:
+    """
+    Progressively aligns sequences: pairwise distances, a UPGMA guide tree, then profile alignments
+    up the tree. Pairwise alignments run in a process pool.
+
+    Args:
+        names (list): Sequence names.
+        sequences (list): Amino acid sequences.
+        executor (Executor): Pool for the pairwise alignments, instead of one created here.
+        max_workers (int): Processes of a pool created here (default: CPU count); 1 aligns in this process.
+
+    Returns:
+        Alignment: Alignment with rows in the order of sequences.
+    """
+    sequences = [s.upper() for s in sequences]
+    if len(sequences) < 2:
+        return Alignment(names, np.stack([encode(s) for s in sequences]) if sequences else np.zeros((0, 0), dtype=np.uint8))
+
+    pool = None if executor or max_workers == 1 else ProcessPoolExecutor(max_workers=max_workers)
+    with nullcontext() if pool is None else pool:
+        distances = pairwise_distances(sequences, executor or pool)
+
+    clusters = {i: (np.array([i]), encode(s)[None, :]) for i, s in enumerate(sequences)}
+    for k, (a, b) in enumerate(guide_tree(distances)):
+        (members_a, rows_a), (members_b, rows_b) = clusters.pop(a), clusters.pop(b)
+        cols_a, cols_b = align_profiles(profile(rows_a), profile(rows_b))
+        clusters[len(sequences) + k] = (np.concatenate((members_a, members_b)),
+                                        np.concatenate((_gapped(rows_a, cols_a), _gapped(rows_b, cols_b))))
+
+    (members, rows), = clusters.values()
+    return Alignment(names, rows[np.argsort(members)], distances)
+
+def align_panel(panel: tuple) -> Alignment:
+    """
+    Aligns one target's panel in this process, for spreading a batch of targets over a process pool.
+
+    Args:
+        panel (tuple): (names, sequences).
+
+    Returns:
+        Alignment: Alignment.
+    """
+    names, sequences = panel
+    return align(names, sequences, max_workers=1)
+
+def align_batch(panels: list, max_workers: int | None = None) -> list:
+    """
+    Aligns the panels of many targets, one target per process.
+
+    Args:
+        panels (list): (names, sequences) per target.
+        max_workers (int): Processes (default: CPU count).
+
+    Returns:
+        list: Alignments in the order of panels, None for a panel that failed to align.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(align_panel, panel) for panel in panels]
+        alignments = []
+        for future in futures:
+            try:
+                alignments.append(future.result())
+            except Exception:
+                # the target's own align stage retries it and records the failure
+                alignments.append(None)
+        return alignments
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+import numpy as np
+
+@dataclass(frozen=True)
+class CropSettings:
+    """
+    Represents the pLDDT cropping thresholds.
+
+    Attributes:
+        threshold (float): Minimum per-residue pLDDT kept (0 disables cropping).
+        min_length (int): Minimum length of a kept confident segment.
+        max_gap (int): Low-confidence gaps up to this length between confident segments are kept (short loops).
+    """
+    threshold: float = 70.0
+    min_length: int = 10
+    max_gap: int = 5
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+def read_plddt(pdb: bytes) -> tuple:
+    """
+    Reads per-residue pLDDT from the B-factor column of the CA atoms of an AlphaFold model.
+
+    Args:
+        pdb (bytes): PDB content.
+
+    Returns:
+        tuple: (residue numbers, pLDDT) arrays.
+    """
+    ca = [line for line in pdb.split(b"\n") if line.startswith(b"ATOM") and line[12:16].strip() == b"CA"]
+    if not ca:
+        return (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+    residues = np.array([line[22:26] for line in ca]).astype(np.int32)
+    plddt = np.array([line[60:66] for line in ca]).astype(np.float32)
+    return (residues, plddt)
+
+def confident_segments(residues: np.ndarray, plddt: np.ndarray, settings: CropSettings) -> np.ndarray:
+    """
+    Finds runs of residues at or above the pLDDT threshold with run-length logic on the mask:
+    runs are bridged over short gaps, then runs shorter than min_length are dropped.
+
+    Args:
+        residues (np.ndarray): Residue numbers.
+        plddt (np.ndarray): Per-residue pLDDT.
+        settings (CropSettings): Thresholds.
+
+    Returns:
+        np.ndarray: (n, 2) array of inclusive (start, end) residue numbers.
+    """
+    if residues.size == 0:
+        return np.empty((0, 2), dtype=np.int32)
+
+    mask = plddt >= settings.threshold
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+    if starts.size > 1 and settings.max_gap > 0:
+        # merge runs whose separating gap is short
+        keep = np.concatenate(([True], starts[1:] - ends[:-1] - 1 > settings.max_gap))
+        last = np.concatenate((np.flatnonzero(keep)[1:] - 1, [ends.size - 1]))
+        starts, ends = starts[keep], ends[last]
+
+    long_enough = ends - starts + 1 >= settings.min_length
+    return np.stack((residues[starts[long_enough]], residues[ends[long_enough]]), axis=1)
+
+def intersect(segments: np.ndarray, domains: list) -> np.ndarray:
+    """
+    Intersects confident segments with annotation domains.
+
+    Args:
+        segments (np.ndarray): (n, 2) confident segments.
+        domains (list): (start, end) domain ranges.
+
+    Returns:
+        np.ndarray: (m, 2) non-empty intersections.
+    """
+    if segments.size == 0 or not domains:
+        return segments
+    domains = np.asarray(domains, dtype=np.int32).reshape(-1, 2)
+    starts = np.maximum(segments[:, None, 0], domains[None, :, 0])
+    ends = np.minimum(segments[:, None, 1], domains[None, :, 1])
+    valid = starts <= ends
+    return np.stack((starts[valid], ends[valid]), axis=1)
+
+def crop_pdb(pdb: bytes, segments: np.ndarray) -> bytes:
+    """
+    Keeps only the atoms of residues inside the segments.
+
+    Args:
+        pdb (bytes): PDB content.
+        segments (np.ndarray): (n, 2) residue ranges to keep.
+
+    Returns:
+        bytes: Cropped PDB content.
+    """
+    lines = pdb.split(b"\n")
+    is_atom = np.array([line.startswith((b"ATOM", b"HETATM")) for line in lines])
+    residues = np.zeros(len(lines), dtype=np.int32)
+    atom_idx = np.flatnonzero(is_atom)
+    if atom_idx.size:
+        residues[atom_idx] = np.array([lines[i][22:26] for i in atom_idx]).astype(np.int32)
+
+    inside = ((residues[:, None] >= segments[None, :, 0]) & (residues[:, None] <= segments[None, :, 1])).any(axis=1)
+    keep = ~is_atom | inside
+    # drop TER records, chain breaks of the cropped model are not termini
+    return b"\n".join(line for line, k in zip(lines, keep) if k and not line.startswith(b"TER"))
@@ -0,0 +1,71 @@
+from collections import Counter
+
+def kmer_profile(seq: str, k: int = 3) -> Counter:
+    """
+    Counts the k-mers of a sequence.
+
+    Args:
+        seq (str): Amino acid sequence.
+        k (int): k-mer length.
+
+    Returns:
+        Counter: k-mer counts.
+    """
+    seq = seq.upper()
+    return Counter(seq[i:i + k] for i in range(len(seq) - k + 1))
+
+def kmer_similarity(query, candidate, k: int = 3) -> float:
+    """
+    Fraction of shared k-mers between two sequences (multiset overlap over the smaller profile).
+    Used as a cheap prefilter before alignment.
+
+    Args:
+        query (str | Counter): Query sequence or its k-mer profile.
+        candidate (str | Counter): Candidate sequence or its k-mer profile.
+        k (int): k-mer length.
+
+    Returns:
+        float: Shared k-mer fraction in [0, 1].
+    """
+    q = query if isinstance(query, Counter) else kmer_profile(query, k)
+    c = candidate if isinstance(candidate, Counter) else kmer_profile(candidate, k)
+    smaller = min(sum(q.values()), sum(c.values()))
+    if not smaller:
+        return 0.0
+    return sum((q & c).values()) / smaller
+
+def alignment_identity(seq_a: str, seq_b: str) -> float:
+    """
+    Global alignment identity between two sequences (BLOSUM62, affine gaps; see msa.align_profiles).
+
+    Args:
+        seq_a (str): First sequence.
+        seq_b (str): Second sequence.
+
+    Returns:
+        float: Identical positions over alignment length, in [0, 1].
+    """
+    from analysis.msa import pairwise_identity
+    return pairwise_identity(seq_a, seq_b)
+
+def rank_candidates(query: str, candidates: dict, k: int = 3, top: int = 3) -> list:
+    """
+    Ranks candidate sequences against a query. All candidates are scored by k-mer similarity,
+    and the best `top` of them are refined by alignment identity.
+
+    Args:
+        query (str): Query sequence.
+        candidates (dict): Candidate sequences keyed by accession.
+        k (int): k-mer length of the prefilter.
+        top (int): Number of candidates kept after the prefilter.
+
+    Returns:
+        list: (accession, identity, kmer_score) tuples, best first.
+    """
+    query_profile = kmer_profile(query, k)
+    prefiltered = sorted(
+        ((acc, kmer_similarity(query_profile, seq, k)) for acc, seq in candidates.items() if seq),
+        key=lambda x: x[1], reverse=True)[:top]
+
+    ranked = [(acc, alignment_identity(query, candidates[acc]), kmer_score) for acc, kmer_score in prefiltered]
+    return sorted(ranked, key=lambda x: (x[1], x[2]), reverse=True)
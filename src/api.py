@@ -0,0 +1,212 @@
+import asyncio
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from queue import Queue
+from threading import Event
+from time import time
+from typing import AsyncIterator, Callable, Iterator
+import pipeline
+from client.base_client import request_stats
+from storage import catalog, workspace
+
+@dataclass
+class PassportOptions:
+    """
+    Represents the options of a passport build.
+
+    Attributes:
+        min_identity (float): Minimum identity to the human sequence for automatic ortholog selection.
+        interactive (bool): Prompt on stdin for ambiguous orthologs instead of choosing automatically.
+        crop (CropSettings): pLDDT cropping, None for the command line defaults.
+        output_root (str): Directory outputs are written under, None for the current workspace.
+        run_id (str): Run directory under output_root, None for the current workspace.
+        align_executor (Executor): Process pool for structural alignment (see init_pymol_worker), None for one per target.
+        msa (str): Sequence aligner, "native" (built in) or "geneious" (Geneious MUSCLE).
+    """
+    min_identity: float = pipeline.MIN_ORTHOLOG_IDENTITY
+    interactive: bool = False
+    crop: object = None
+    output_root: str = None
+    run_id: str = None
+    align_executor: object = None
+    msa: str = "native"
+
+@dataclass
+class PassportEvent:
+    """
+    Represents a progress event of a passport build.
+
+    Event types and their data:
+        target_started: none.
+        stage_started: stage.
+        stage_finished: stage, seconds.
+        stage_failed: stage, error.
+        message: message.
+        warning: stage, organism, error, for a part the passport is built without.
+        artifact: kind (state, msa, structure_alignment, structure_img, string_img, string_partners, deck, failure_report), path.
+        request_stats: hosts, the HTTP totals of this process so far (shared by concurrent targets).
+        target_finished: output_path, timings, errors (the warnings of the target; empty for a complete passport).
+        error: error, traceback, timings.
+        cancelled: none.
+
+    Attributes:
+        type (str): Event type.
+        protein_name (str): Target protein name.
+        protein_id (str): Target UniProt accession.
+        data (dict): Event data.
+        time (float): Unix time of the event.
+    """
+    type: str
+    protein_name: str
+    protein_id: str
+    data: dict = field(default_factory=dict)
+    time: float = field(default_factory=time)
+
+def _configure(options: PassportOptions):
+    if options.output_root is not None or options.run_id is not None:
+        workspace.configure(root=options.output_root, run_id=options.run_id)
+
+def _crop(options: PassportOptions):
+    if options.crop is not None:
+        return options.crop
+    from analysis.plddt import CropSettings
+    return CropSettings()
+
+def _build(protein_id, protein_name, user, options, on_event, cancel):
+    """
+    Builds one passport, reporting progress through on_event(PassportEvent).
+    """
+    def emit(event_type, **data):
+        on_event(PassportEvent(event_type, protein_name, protein_id, data))
+
+    emit("target_started")
+    timings, errors = {}, []
+    try:
+        output_path = pipeline.run(protein_id, protein_name, user, interactive=options.interactive, min_identity=options.min_identity,
+                                   executor=options.align_executor, timings=timings, crop=_crop(options), emit=emit, cancel=cancel, errors=errors, msa=options.msa)
+    except BaseException as e:
+        # the stats come first, so the terminal event is the target's last
+        emit("request_stats", hosts=request_stats())
+        if isinstance(e, pipeline.Cancelled):
+            emit("cancelled")
+        elif isinstance(e, Exception):
+            emit("error", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc(), timings=timings)
+        raise
+
+    emit("request_stats", hosts=request_stats())
+    emit("target_finished", output_path=str(output_path), timings=timings, errors=errors)
+    return output_path
+
+def build_passport(accession: str, name: str, user: str, options: PassportOptions = None, on_event: Callable = None, cancel: Event = None):
+    """
+    Builds the passport of one protein without printing.
+
+    Args:
+        accession (str): UniProt accession of the human protein.
+        name (str): Protein name, used for output paths.
+        user (str): Author shown in the deck.
+        options (PassportOptions): Build options.
+        on_event (callable): Called with each PassportEvent as the build progresses.
+        cancel (Event): Set to stop the build before its next stage.
+
+    Returns:
+        Path: Deck path.
+
+    Raises:
+        pipeline.Cancelled: If cancel was set before the build finished.
+    """
+    options = options or PassportOptions()
+    _configure(options)
+    try:
+        return _build(accession, name, user, options, on_event or (lambda event: None), cancel)
+    finally:
+        catalog.flush_all()
+
+def build_passports(targets, user: str, options: PassportOptions = None, concurrency: int = 2, cancel: Event = None) -> Iterator[PassportEvent]:
+    """
+    Builds the passports of many proteins concurrently, yielding events as they happen. A failed target
+    yields an error event and the others carry on; each target ends with exactly one target_finished,
+    error or cancelled event, so results can be used as soon as each protein finishes.
+
+    Closing the generator or setting cancel stops targets that have not started, and running targets
+    stop before their next stage.
+
+    Args:
+        targets (iterable): (protein_name, accession) pairs.
+        user (str): Author shown in the decks.
+        options (PassportOptions): Build options.
+        concurrency (int): Targets built at once.
+        cancel (Event): Set to stop the batch.
+
+    Yields:
+        PassportEvent: Progress events of every target.
+    """
+    options = options or PassportOptions()
+    if options.interactive and concurrency > 1:
+        raise ValueError("Interactive ortholog selection needs concurrency=1")
+    _configure(options)
+
+    targets = list(targets)
+    cancel = cancel or Event()
+    events = Queue()
+    done = object()
+
+    def build(protein_name, protein_id):
+        try:
+            if cancel.is_set():
+                events.put(PassportEvent("cancelled", protein_name, protein_id))
+            else:
+                _build(protein_id, protein_name, user, options, events.put, cancel)
+        except Exception:
+            # already reported as an error or cancelled event
+            pass
+        finally:
+            events.put(done)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for protein_name, protein_id in targets:
+            executor.submit(build, protein_name, protein_id)
+
+        remaining = len(targets)
+        while remaining:
+            event = events.get()
+            if event is done:
+                remaining -= 1
+            else:
+                yield event
+    finally:
+        cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        catalog.flush_all()
+
+async def build_passports_async(targets, user: str, options: PassportOptions = None, concurrency: int = 2,
+                                cancel: Event = None) -> AsyncIterator[PassportEvent]:
+    """
+    Async iterator counterpart of build_passports. The builds run in worker threads, so the event loop is
+    never blocked; leaving the loop early or cancelling the consuming task cancels the batch.
+
+    Args:
+        targets (iterable): (protein_name, accession) pairs.
+        user (str): Author shown in the decks.
+        options (PassportOptions): Build options.
+        concurrency (int): Targets built at once.
+        cancel (Event): Set to stop the batch.
+
+    Yields:
+        PassportEvent: Progress events of every target.
+    """
+    cancel = cancel or Event()
+    events = build_passports(targets, user, options=options, concurrency=concurrency, cancel=cancel)
+    # one thread steps the generator, so it can be closed there once a pending next() has returned
+    stepper = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_running_loop()
+    try:
+        while (event := await loop.run_in_executor(stepper, next, events, None)) is not None:
+            yield event
+    finally:
+        cancel.set()
+        # closing shuts the build executor down and flushes the catalog without blocking the event loop
+        stepper.submit(events.close)
+        stepper.shutdown(wait=False)
@@ -8,8 +8,10 @@ class AlphaFoldClient(BaseClient):
 
     Attributes:
         BASE_URL (str): Base url.
+        RATE_LIMIT (tuple): Requests per second and burst for AlphaFold.
     """
     BASE_URL = "https://alphafold.ebi.ac.uk"
+    RATE_LIMIT = (10, 20)
 
     def fetch(self, protein_id: str, **kwargs) -> dict:
         """
@@ -19,21 +21,28 @@ class AlphaFoldClient(BaseClient):
             protein_id (str): Protein of interest.
         
         Returns:
-            dict: File name and content
+            dict: File name and content, or an empty dict if AlphaFold has no model.
         """
         url = f"{self.BASE_URL}/api/prediction/{protein_id}"
             
-        r = requests.get(url, verify=False)
+        r = self.session.get(url, verify=False)
 
         if not r.ok:
             return {}
 
-        response_dict = r.json()[0]
+        predictions = r.json()
+        if not predictions:
+            return {}
+
+        response_dict = predictions[0]
         pdb_url = response_dict['pdbUrl']
 
         pdb_file_name = pdb_url.rsplit("/",1)[-1]
 
-        pdb_r = requests.get(pdb_url, verify=False)
+        pdb_r = self.session.get(pdb_url, verify=False)
+
+        if not pdb_r.ok:
+            return {}
 
         return {'file_name': pdb_file_name,
                 'content': pdb_r.content}
@@ -1,10 +1,80 @@
 from abc import ABC, abstractmethod
+from threading import Lock
+from time import perf_counter
 from typing import Any
+from urllib.parse import urlparse
+import requests, urllib3
+from requests.adapters import HTTPAdapter
+from client import rate_limiter
+
+# the clients request with verify=False
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+class _RateLimitedSession(requests.Session):
+    """
+    Session that waits for the target host's rate limiter before every request.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        host = urlparse(url).hostname
+        start = perf_counter()
+        limiter = rate_limiter.limiter_for(host)
+        if limiter:
+            limiter.acquire()
+        waited = perf_counter() - start
+        try:
+            return super().request(method, url, *args, **kwargs)
+        finally:
+            _record(host, waited, perf_counter() - start - waited)
+
+_session = None
+_session_lock = Lock()
+_stats = {}
+_stats_lock = Lock()
+
+def _record(host: str, waited: float, elapsed: float):
+    with _stats_lock:
+        stats = _stats.setdefault(host, {"requests": 0, "rate_limit_wait": 0.0, "elapsed": 0.0})
+        stats["requests"] += 1
+        stats["rate_limit_wait"] += waited
+        stats["elapsed"] += elapsed
+
+def request_stats() -> dict:
+    """
+    Gets the HTTP request totals of this process.
+
+    Returns:
+        dict: Per host, the number of requests and the seconds spent waiting for the rate limiter and for responses.
+    """
+    with _stats_lock:
+        return {host: {key: round(value, 3) for key, value in stats.items()} for host, stats in _stats.items()}
 
 class BaseClient(ABC):
     """
         Abstract class for a client class.
+
+        Attributes:
+            POOL_SIZE (int): Connections kept open per host by the shared session.
+            RATE_LIMIT (tuple): (requests per second, burst) allowed for the BASE_URL host.
     """
+    POOL_SIZE = 32
+    RATE_LIMIT = (10, 10)
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        HTTP session shared by every client in this process, so connections and TLS stay warm across requests.
+        Requests are throttled per host by token buckets shared across threads and processes.
+        """
+        global _session
+        rate_limiter.register(urlparse(self.BASE_URL).hostname, *self.RATE_LIMIT)
+        with _session_lock:
+            if _session is None:
+                _session = _RateLimitedSession()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.POOL_SIZE)
+                _session.mount("https://", adapter)
+                _session.mount("http://", adapter)
+        return _session
 
     @abstractmethod
     def fetch(self, protein_id, **kwargs) -> Any:
@@ -17,4 +87,4 @@ class BaseClient(ABC):
         Returns:
             dict: Reponse.
         """
-        pass
\ No newline at end of file
+        pass
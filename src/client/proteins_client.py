@@ -1,42 +1,85 @@
-import requests, sys, urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 from client.base_client import BaseClient
 
+TOPOLOGY_FEATURES = {"TOPO_DOM", "TRANSMEM", "INTRAMEM"}
+
 class ProteinsClient(BaseClient):
     """
-    Represents AlphaFold client.
+    Represents EBI Proteins API client.
 
     Attributes:
         BASE_URL (str): Base url.
+        RATE_LIMIT (tuple): Requests per second and burst for Proteins API (published limit 200/s per user).
+        CHUNK_SIZE (int): Accessions per request (API maximum is 100).
     """
     BASE_URL = "https://www.ebi.ac.uk/proteins/api"
+    RATE_LIMIT = (50, 100)
+    CHUNK_SIZE = 100
 
     def fetch(self, protein_id, **kwargs) -> str:
         """
-        Gets topology annotations of given protein.
+        Gets topology annotations of given protein, or molecule processing annotations if it has no topology.
 
         Args:
             protein_id (str): Protein of interest.
-        
+
         Returns:
             str: Annotations.
         """
-        url = f"{self.BASE_URL}/features/{protein_id}?categories=TOPOLOGY"
-        headers = { "Accept" : "text/x-gff"}
+        return self.fetch_many([protein_id])[protein_id]
 
-        r = requests.get(url, headers=headers, verify=False)
+    def fetch_many(self, protein_ids: list) -> dict:
+        """
+        Gets annotations (see fetch) of many proteins. Both feature categories are requested at once for
+        up to CHUNK_SIZE accessions per request, and the GFF is split per accession while streaming.
+
+        Args:
+            protein_ids (list): Proteins of interest.
 
-        if not r.ok:
-            r.raise_for_status()
-            sys.exit()
-        
-        if r.text.endswith("\n\n"):
-            url = f"{self.BASE_URL}/features/{protein_id}?categories=MOLECULE_PROCESSING"
+        Returns:
+            dict: GFF text keyed by accession.
+        """
+        protein_ids = list(dict.fromkeys(protein_ids))
+        regions = {protein_id: None for protein_id in protein_ids}
+        features = {protein_id: [] for protein_id in protein_ids}
+        version = "##gff-version 3"
+
+        for start in range(0, len(protein_ids), self.CHUNK_SIZE):
+            chunk = protein_ids[start:start + self.CHUNK_SIZE]
+            params = {"accession": ",".join(chunk), "categories": "TOPOLOGY,MOLECULE_PROCESSING", "size": self.CHUNK_SIZE}
             headers = { "Accept" : "text/x-gff"}
-            r = requests.get(url, headers=headers, verify=False)
-            
-            if not r.ok:
+
+            with self.session.get(f"{self.BASE_URL}/features", params=params, headers=headers, verify=False, stream=True) as r:
                 r.raise_for_status()
-                sys.exit()
-        
-        return r.text
\ No newline at end of file
+                for line in r.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    if line.startswith("##gff-version"):
+                        version = line
+                    elif line.startswith("##sequence-region"):
+                        accession = line.split()[1]
+                        if accession in regions:
+                            regions[accession] = line
+                    elif not line.startswith("#"):
+                        accession = line.split("\t", 1)[0]
+                        if accession in features:
+                            features[accession].append(line)
+
+        return {protein_id: self._to_gff(version, regions[protein_id], features[protein_id]) for protein_id in protein_ids}
+
+    def _to_gff(self, version: str, region: str, lines: list) -> str:
+        """
+        Builds the GFF of one accession, keeping topology features if there are any and
+        molecule processing features otherwise.
+
+        Args:
+            version (str): GFF version directive.
+            region (str): Sequence region directive of the accession.
+            lines (list): Feature lines of the accession.
+
+        Returns:
+            str: GFF text.
+        """
+        topology = [line for line in lines if line.split("\t")[2:3] and line.split("\t")[2] in TOPOLOGY_FEATURES]
+        kept = topology or lines
+        header = [version] + ([region] if region else [])
+        return "\n".join(header + kept) + "\n"
@@ -0,0 +1,130 @@
+import asyncio, os, struct, tempfile
+from pathlib import Path
+from threading import Lock
+from time import sleep, time
+
+try:
+    import fcntl
+except ImportError:
+    # no cross-process locking off POSIX, the bucket is then shared by threads only
+    fcntl = None
+
+STATE_DIR = Path(os.environ.get("PASSPORT_RATE_LIMIT_DIR", Path(tempfile.gettempdir()) / "protein_passport_rate_limits"))
+_STATE = struct.Struct("dd")
+
+class RateLimiter():
+    """
+    Represents a token bucket for one host, shared by every thread, asyncio task and process on this
+    machine. The bucket (tokens, last refill time) lives in a small file guarded by an exclusive flock.
+
+    Attributes:
+        host (str): Host the bucket applies to.
+        rate (float): Tokens added per second.
+        burst (int): Bucket capacity.
+        path (Path): Bucket state file.
+    """
+    host: str
+    rate: float
+    burst: int
+    path: Path
+
+    def __init__(self, host: str, rate: float, burst: int):
+        """
+        Constructor for RateLimiter.
+
+        Args:
+            host (str): Host the bucket applies to.
+            rate (float): Requests per second.
+            burst (int): Maximum requests sent back to back.
+        """
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        STATE_DIR.mkdir(parents=True, exist_ok=True)
+        self.path = STATE_DIR / f"{host}.bucket"
+        self._lock = Lock()
+
+    def _take(self) -> float:
+        """
+        Takes a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available.
+        """
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                # wall-clock time, since monotonic clocks are not comparable across processes
+                now = time()
+                data = os.pread(fd, _STATE.size, 0)
+                tokens, last = _STATE.unpack(data) if len(data) == _STATE.size else (float(self.burst), now)
+                tokens = min(float(self.burst), tokens + max(0.0, now - last) * self.rate)
+
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                os.pwrite(fd, _STATE.pack(tokens, now), 0)
+                return wait
+            finally:
+                os.close(fd)
+
+    def acquire(self):
+        """
+        Blocks until a request may be sent.
+        """
+        while (wait := self._take()) > 0:
+            sleep(wait)
+
+    async def acquire_async(self):
+        """
+        Waits without blocking the event loop until a request may be sent.
+        """
+        while (wait := await asyncio.to_thread(self._take)) > 0:
+            await asyncio.sleep(wait)
+
+_limiters = {}
+_limiters_lock = Lock()
+
+def _env_limits() -> dict:
+    """
+    Reads per-host overrides from PASSPORT_RATE_LIMITS ("host=rate:burst,host=rate:burst").
+
+    Returns:
+        dict: (rate, burst) keyed by host.
+    """
+    limits = {}
+    for item in filter(None, os.environ.get("PASSPORT_RATE_LIMITS", "").split(",")):
+        host, _, spec = item.partition("=")
+        rate, _, burst = spec.partition(":")
+        limits[host.strip()] = (float(rate), int(burst or max(1, float(rate))))
+    return limits
+
+def register(host: str, rate: float, burst: int):
+    """
+    Sets the limit of a host unless one is already set; PASSPORT_RATE_LIMITS takes precedence.
+
+    Args:
+        host (str): Host name.
+        rate (float): Requests per second.
+        burst (int): Bucket capacity.
+    """
+    with _limiters_lock:
+        if host not in _limiters:
+            rate, burst = _env_limits().get(host, (rate, burst))
+            _limiters[host] = RateLimiter(host, rate, burst)
+
+def limiter_for(host: str) -> RateLimiter | None:
+    """
+    Gets the limiter of a host.
+
+    Args:
+        host (str): Host name.
+
+    Returns:
+        RateLimiter: Limiter, or None if the host is not limited.
+    """
+    return _limiters.get(host)
@@ -1,53 +1,102 @@
-import requests, sys, urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import csv, io, json
 from client.base_client import BaseClient
-from time import sleep
-from pathlib import Path
+from storage import artifacts, workspace
 
 class StringClient(BaseClient):
     """
-    Represents STRING client.
+    Represents STRING client. Interaction partners and the edges between them are fetched as TSV
+    for many identifiers per request and cached on disk per identifier.
 
     Attributes:
         BASE_URL (str): Base url.
+        RATE_LIMIT (tuple): Requests per second and burst for STRING (asks for one call per second).
+        SPECIES (int): NCBI taxon ID of the queried proteins.
+        PARTNER_LIMIT (int): Partners fetched per protein.
+        CHUNK_SIZE (int): Identifiers sent per request.
     """
     BASE_URL = "https://string-db.org/api"
-    
-    def fetch(self, protein_name, **kwargs) -> str:
+    RATE_LIMIT = (1, 1)
+    SPECIES = 9606
+    PARTNER_LIMIT = 20
+    CHUNK_SIZE = 100
+
+    def fetch(self, protein_id, **kwargs) -> dict:
         """
-        Gets STRING network image file of given protein.
+        Gets STRING interaction partners of given protein and the edges between them.
 
         Args:
-            protein_id (str): Protein of interest.
-        
+            protein_id (str): STRING ID of protein of interest.
+
         Returns:
-            str: Image file path.
+            dict: 'partners' (list of partner rows) and 'edges' (list of edge rows).
         """
-        output_format = "image"
-        method = "network"
-        params = {
-            "identifiers" : kwargs.get('string_id'), 
-            "species" : 9606, 
-            "network_flavor": "confidence",
-            "network_type": "physical",
-            "add_color_nodes": 20
-            }
+        return self.fetch_many([protein_id], limit=kwargs.get('limit', self.PARTNER_LIMIT))[protein_id]
+
+    def fetch_many(self, string_ids: list, limit: int = PARTNER_LIMIT) -> dict:
+        """
+        Gets STRING interaction data of many proteins, with one partners request and one network
+        request per chunk of identifiers. Cached identifiers are not requested again.
+
+        Args:
+            string_ids (list): STRING IDs of proteins of interest.
+            limit (int): Partners per protein.
+
+        Returns:
+            dict: Interaction data (see fetch) keyed by STRING ID.
+        """
+        cache_dir = workspace.current().root / "string_cache"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+        results = {}
+        missing = []
+        for string_id in dict.fromkeys(string_ids):
+            cache_path = cache_dir / f"{string_id}_{limit}.json"
+            if cache_path.exists():
+                results[string_id] = json.loads(cache_path.read_text())
+            else:
+                missing.append(string_id)
 
-        url = "/".join([self.BASE_URL, output_format, method]) 
-        r = requests.post(url, data=params, verify=False)
+        for start in range(0, len(missing), self.CHUNK_SIZE):
+            chunk = missing[start:start + self.CHUNK_SIZE]
+            partner_rows = self._post_tsv("interaction_partners", chunk, limit=limit)
 
-        if not r.ok:
-            r.raise_for_status()
-            sys.exit()
+            partners = {string_id: [] for string_id in chunk}
+            for row in partner_rows:
+                if row["stringId_A"] in partners:
+                    partners[row["stringId_A"]].append(row)
 
-        output_dir = Path(__file__).parent.parent.parent
-        output_dir.mkdir(parents=True, exist_ok=True)
+            nodes = {string_id: {string_id, *(row["stringId_B"] for row in rows)} for string_id, rows in partners.items()}
+            edge_rows = self._post_tsv("network", sorted(set().union(*nodes.values()))) if nodes else []
+
+            for string_id in chunk:
+                edges = [row for row in edge_rows if row["stringId_A"] in nodes[string_id] and row["stringId_B"] in nodes[string_id]]
+                results[string_id] = {"partners": partners[string_id], "edges": edges}
+                # the cache root is shared by concurrent shards, which must never read a partial file
+                artifacts.atomic_write(cache_dir / f"{string_id}_{limit}.json", json.dumps(results[string_id]).encode())
+
+        return results
+
+    def _post_tsv(self, method: str, string_ids: list, **params) -> list:
+        """
+        Posts a TSV request for many identifiers.
+
+        Args:
+            method (str): STRING API method.
+            string_ids (list): STRING IDs.
+
+        Returns:
+            list: Rows as dicts keyed by column name.
+        """
+        data = {
+            "identifiers": "\r".join(string_ids),
+            "species": self.SPECIES,
+            "network_type": "physical",
+            "caller_identity": "protein_passport_automation",
+            **params
+            }
 
-        file_name = output_dir / f"output_{protein_name}" / "string_network.png"
+        url = "/".join([self.BASE_URL, "tsv", method])
+        r = self.session.post(url, data=data, verify=False)
+        r.raise_for_status()
 
-        with open(file_name, 'wb') as fh:
-            fh.write(r.content)
-        
-        sleep(1)
-        
-        return str(file_name)
+        return list(csv.DictReader(io.StringIO(r.text), delimiter="\t"))
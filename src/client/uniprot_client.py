@@ -8,8 +8,10 @@ class UniProtClient(BaseClient):
 
     Attributes:
         BASE_URL (str): Base url.
+        RATE_LIMIT (tuple): Requests per second and burst for UniProt REST.
     """
     BASE_URL = "https://rest.uniprot.org"
+    RATE_LIMIT = (25, 50)
 
     def fetch(self, protein_id, **kwargs) -> dict:
         """
@@ -62,14 +64,36 @@ class UniProtClient(BaseClient):
             params = {}
             headers = {}
             url = '/'.join([self.BASE_URL, "uniprotkb", protein_id + ".fasta"])
-            r = requests.get(url, verify=False)
+            r = self.session.get(url, verify=False)
+            r.raise_for_status()
             return r.text
         
-        r = requests.get(url, headers=headers, params=params, verify=False)
+        r = self.session.get(url, headers=headers, params=params, verify=False)
         
         if not r.ok:
             return {}
         
         data = r.json()
         return data
-            
\ No newline at end of file
+
+    def download_proteome(self, taxon_id, path) -> int:
+        """
+        Streams the reference proteome of an organism to a FASTA file.
+
+        Args:
+            taxon_id (int): NCBI taxonomy ID.
+            path (str | Path): Output FASTA path.
+
+        Returns:
+            int: Number of sequences written.
+        """
+        params = {"query": f"organism_id:{taxon_id} AND keyword:KW-1185", "format": "fasta"}
+        url = '/'.join([self.BASE_URL, "uniprotkb", "stream"])
+        count = 0
+        with self.session.get(url, params=params, stream=True, verify=False) as r:
+            r.raise_for_status()
+            with open(path, "w") as fh:
+                for line in r.iter_lines(decode_unicode=True):
+                    fh.write(line + "\n")
+                    count += line.startswith(">")
+        return count
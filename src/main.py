@@ -1,164 +1,252 @@
 import argparse
 import csv
+import hashlib
+import json
+import os
+import socket
+import sys
+import traceback
+from threading import Event, Thread
+from time import perf_counter, sleep
 from pathlib import Path
-from client.uniprot_client import UniProtClient
-from client.proteins_client import ProteinsClient
-from client.alphafold_client import AlphaFoldClient
-from client.string_client import StringClient
-from models.protein_model.human_protein import HumanProtein
-from models.protein_model.ortholog import Ortholog
-from models.protein_model.protein import Protein
+import pipeline
+from pipeline import MIN_ORTHOLOG_IDENTITY, TEMPLATE_PATH
 from models.organism import Organism
-from models.entry import Entry
-from models.image import Img
+from models.run_state import RunState
+from storage import catalog, workspace
 
-def _uniprot_query(protein_name, protein_id) -> dict:
-    uniprot_data = {o: None for o in Organism}
+QUEUE_PATH = Path(__file__).parent.parent / "passport_queue.db"
 
-    uniprot_client = UniProtClient()
-    human_data =  uniprot_client.fetch(protein_id, kb=True)
-    uniprot_data[Organism.HUMAN] = human_data
-    uniref_data = uniprot_client.fetch(protein_id, ref=True)
-    
-    protein_name = human_data['genes'][0]['geneName']['value']
-    rec_name=human_data['proteinDescription']['recommendedName']['fullName']['value']
-
-    orthologs = list(Organism)
-
-    if uniref_data.get('results'):
-        for result in uniref_data['results']:
-            match = next((o for o in orthologs if result['organismTaxId'] == o.value[1] and result['proteinName'] == rec_name), None)
-
-            if match:
-                match_id = result['accessions'][0]
-                uniref_r = uniprot_client.fetch(protein_id=match_id, kb=True)
-                search_r = uniprot_client.fetch(protein_id=rec_name, gene=protein_name, organism=match.value[1], kb=True, search=True)
-                if uniref_r['primaryAccession'] == search_r['results'][0]['primaryAccession']:
-                    uniprot_data[match] = uniref_r
-                else:
-                    chosen_ortholog = _choose_ortholog_selection(organism_str=match.name, uniref_accessions=result['accessions'], search=search_r['results'])
-                    uniprot_data[match] = uniprot_client.fetch(chosen_ortholog, kb=True)
-                orthologs.remove(match)
-            if not orthologs: break
-
-    for organism in orthologs:
-        r = uniprot_client.fetch(protein_id=rec_name, gene=protein_name, organism=organism.value[1], kb=True, search=True)
-        if r['results']:
-            uniprot_data[organism] = r['results'][0]
-    
-    return uniprot_data
+def _work(args):
+    from storage.job_queue import JobQueue
+
+    queue = JobQueue(args.queue, max_attempts=args.max_attempts)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    while True:
+        job = queue.claim(worker, lease=args.lease)
+        if job is None:
+            # pending jobs may still be waiting out their retry backoff, and running jobs of a dead worker
+            # come back once their lease expires
+            counts = queue.counts()
+            if counts.get("pending") or counts.get("running"):
+                sleep(10)
+                continue
+            print(f"No jobs available for {worker}")
+            return
+
+        # keep the lease alive while the passport is being built; once it is lost, another worker owns the job
+        stop, lost = Event(), Event()
+        def heartbeat():
+            while not stop.wait(args.lease / 3):
+                if not queue.renew(job["id"], worker, lease=args.lease):
+                    lost.set()
+                    return
+        Thread(target=heartbeat, daemon=True).start()
+
+        timings, errors = {}, []
+        try:
+            output_path = pipeline.run(job["protein_id"], job["protein_name"], f"{args.first_name} {args.last_name}", 
+                                       min_identity=args.min_identity, timings=timings, crop=_crop_settings(args), msa=args.msa, cancel=lost, 
+                                       errors=errors)
+            catalog.flush_all()
+            if not queue.complete(job["id"], worker, output_path, timings, errors):
+                print(f"{job['protein_name']}: lease lost to another worker, leaving the job to it")
+        except pipeline.Cancelled:
+            print(f"{job['protein_name']}: lease lost to another worker, stopped building")
+        except Exception as e:
+            print(f"{job['protein_name']} failed (attempt {job['attempts']}): {type(e).__name__}: {e}")
+            queue.fail(job["id"], worker, f"{type(e).__name__}: {e}\n{traceback.format_exc()}", timings)
+        finally:
+            stop.set()
+
+def _queue_status(args):
+    from storage.job_queue import JobQueue
+
+    queue = JobQueue(args.queue)
+    counts = queue.counts()
+    print(", ".join(f"{status}: {counts.get(status, 0)}" for status in ("pending", "running", "done", "degraded", "failed")))
+    for job in queue.jobs("degraded"):
+        parts = ", ".join(f"{error['organism'] or 'panel'} {error['stage']}" for error in json.loads(job["error"]))
+        print(f"DEGRADED {job['protein_name']} ({job['protein_id']}) built without: {parts}")
+    for job in queue.jobs("failed"):
+        print(f"FAILED {job['protein_name']} ({job['protein_id']}) after {job['attempts']} attempts: {job['error'].splitlines()[0]}")
+
+def _serve(args):
+    from concurrent.futures import ProcessPoolExecutor
+    from models.protein_model.protein import init_pymol_worker
+    from models.entry import load_template
+    from server import PassportServer
+    import pymol
+
+    # warm everything a job needs before the first request arrives
+    load_template(str(TEMPLATE_PATH))
+    align_pool = ProcessPoolExecutor(max_workers=args.align_workers, initializer=init_pymol_worker)
+
+    def run_job(protein_id, protein_name, first_name, last_name):
+        try:
+            return pipeline.run(protein_id, protein_name, f"{first_name} {last_name}", min_identity=args.min_identity, executor=align_pool, crop=_crop_settings(args), 
+                                msa=args.msa)
+        finally:
+            catalog.flush_all()
+
+    try:
+        PassportServer(run_job, workers=args.workers).serve(host=args.host, port=args.port, socket_path=args.socket)
+    finally:
+        align_pool.shutdown()
+
+def _query_catalog(args):
+    conditions, params = [], []
+    for column, op, value in (("run_id", "=", args.run_id), ("organism", "=", args.organism and args.organism.upper()), 
+                              ("protein_name", "=", args.protein), ("rmsd", ">", args.rmsd_above), ("identity", "<", args.identity_below)):
+        if value is not None:
+            conditions.append(f"{column} {op} ?")
+            params.append(value)
+    if args.where:
+        conditions.append(f"({args.where})")
+
+    rows = catalog.current().query(" AND ".join(conditions) or "1", tuple(params), limit=args.limit)
+
+    if args.parquet:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pylist(rows), args.parquet)
+        return print(f"Wrote {len(rows)} rows to {args.parquet}")
+
+    writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+    writer.writerow(catalog.COLUMNS)
+    for row in rows:
+        writer.writerow(["" if row[column] is None else row[column] for column in catalog.COLUMNS])
+
+def _export_sequences(args):
+    from storage.sequence_export import write_genbank, write_gff3_bundle
+
+    skipped = []
+    def states():
+        for protein_name, _ in _read_targets(args):
+            try:
+                yield RunState.load(protein_name)
+            except (OSError, ValueError, KeyError) as e:
+                # missing, truncated or old-schema state: the rest of the batch is still exported
+                print(f"{protein_name}: no usable state ({type(e).__name__}: {e}), skipping")
+                skipped.append(protein_name)
+
+    if args.format == "gff3":
+        # GFF3 puts every feature before the sequences, so each target gets its own bundle
+        for state in states():
+            path = workspace.current().target_dir(state.protein_name) / f"{state.protein_name}_annotated.gff3"
+            with open(path, "w") as fh:
+                write_gff3_bundle(list(state.proteins.values()), fh)
+            for protein in state.proteins.values():
+                protein.release()
+            print(f"Wrote {path}")
+    else:
+        path = Path(args.out or workspace.current().run_dir / "annotated_sequences.gb")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with open(path, "w") as fh:
+            # one target in memory at a time
+            for state in states():
+                count += write_genbank(state.proteins.values(), fh)
+                for protein in state.proteins.values():
+                    protein.release()
+        print(f"Wrote {count} records to {path}")
+
+    if skipped:
+        print(f"Skipped {len(skipped)} targets without a usable state: {', '.join(skipped)}")
+        sys.exit(1)
+
+def _overview(args):
+    from models.overview import build_overview
+
+    def states():
+        for protein_name, protein_id in _read_targets(args):
+            try:
+                state = RunState.load(protein_name)
+            except (OSError, ValueError, KeyError):
+                # missing, truncated or old-schema state: the target is listed as failed
+                state = None
+            yield (protein_name, protein_id, state)
+
+    path = build_overview(states(), args.out or workspace.current().run_dir / "batch_overview.pptx", TEMPLATE_PATH)
+    print(f"Wrote {path}")
+
+def _read_targets(args) -> list:
+    proteins = []
+
+    if args.csv:
+        with open(args.csv, newline="") as csvfile:
+            reader = csv.reader(csvfile)
+            for row in reader:
+                if len(row) >= 2:  
+                    proteins.append((row[0].strip(), row[1].strip()))
+    elif args.manual:
+        protein_name, protein_id = args.manual
+        proteins.append((protein_name, protein_id))
+
+    if args.shard:
+        proteins = workspace.shard_targets(proteins, args.shard)
 
-def _get_fasta_content(protein_id) -> str:
-    uniprot_client = UniProtClient()
-    return uniprot_client.fetch(protein_id=protein_id, fasta=True)
-    
-def _get_annotations_text(protein_id) -> str:
-    annotations_client = ProteinsClient()
-    return annotations_client.fetch(protein_id=protein_id)
-
-def _get_af_pdb(protein_id) -> dict:
-    af_client = AlphaFoldClient()
-    return af_client.fetch(protein_id=protein_id)
-
-def _get_string_db_interactions(protein_name, string_id):
-    string_client = StringClient()
-    return string_client.fetch(protein_name, string_id=string_id)
-
-def _create_proteins(uniprot_data, protein_name) -> dict[Organism, Protein]:
-    proteins = {}
-
-    for organism, results in uniprot_data.items():
-        if results is not None:
-            fasta = _get_fasta_content(results['primaryAccession'])
-            annotations_text = _get_annotations_text(results['primaryAccession'])
-            af_pdb = _get_af_pdb(results['primaryAccession'])
-            
-            if af_pdb:
-                if organism == Organism.HUMAN:
-                    protein = HumanProtein.from_uniprot_result(protein_name=protein_name, uniprot_results=results, af_results=af_pdb, annotations_text=annotations_text, fasta=fasta)
-                else:
-                    protein = Ortholog.from_uniprot_result(protein_name=protein_name, uniprot_results=results, af_results=af_pdb, annotations_text=annotations_text, organism=organism, fasta=fasta)
-        
-            proteins[organism] = protein
-    
     return proteins
 
-def _choose_ortholog_selection(organism_str, uniref_accessions, search):
-    prompt = f"Found multiple {organism_str} orthologs. Please select the desired ortholog from the following:\n"
-    for uniref_accession in uniref_accessions:
-        prompt += f"{uniref_accession}\n"
-    for entry in search:
-        prompt += f"{entry['primaryAccession']}\n"
-    return input(prompt+"Chosen ortholog: ").strip().lower()
+def _load_states(targets: list) -> list:
+    """
+    Loads the states of targets that have one; targets without a readable state are skipped here
+    and reported as failed by their own stage run.
+    """
+    states = []
+    for protein_name, _ in targets:
+        try:
+            states.append(RunState.load(protein_name))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"{protein_name}: no usable state ({type(e).__name__}: {e}), skipping")
+    return states
 
-def _confirm_ortholog_selection(orthologs):
-    while True:
-        prompt = f"Using the following orthologs to create Protein Passport:\n"
-    
-        for organism, data in orthologs.items():
-            prompt += f"{organism.name}: {data['primaryAccession']}\n"
-    
-        prompt += "Press \'y\' if you would like to continue with these orthologs. If incorrect orthologs are present, press \'c\' to enter orthologs manually: "
-    
-        response = input(prompt).strip().lower()
-    
-        if response == 'y':
-            return orthologs
-        elif response == 'c':
-            orthologs = _custom_orthologs()
-        
-def _custom_orthologs():
-    uniprot_data = {o: None for o in Organism}
-    for organism in Organism:
-        protein_id = input(f"Please enter desired {organism.name} UniProt Accession (enter nothing for no ortholog): ").strip()
-        uniprot_client = UniProtClient()
-        data =  uniprot_client.fetch(protein_id, kb=True)
-        if data:
-            uniprot_data[organism] = data
-    return uniprot_data
-        
-
-def _run(protein_id, protein_name, first_name, last_name):
-    print(f"Retrieving information for {protein_name}...")
-    uniprot_data = _uniprot_query(protein_name=protein_name, protein_id=protein_id)
-    
-    #confirmed_orthologs = _confirm_ortholog_selection(uniprot_data)
-    
-    proteins = _create_proteins(uniprot_data=uniprot_data, protein_name=protein_name)
-    human = proteins.get(Organism.HUMAN)
-    orthologs = [protein for organism, protein in proteins.items() if organism != Organism.HUMAN]
+def _parse_shard(value) -> tuple:
+    index, _, count = value.partition("/")
+    try:
+        return (int(index), int(count))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected i/N, got {value}")
 
-    print("Annotating and aligning sequences...")
-    human.annotate_align_seq_geneious(orthologs)
+def _crop_settings(args):
+    from analysis.plddt import CropSettings
+    return CropSettings(threshold=args.plddt_threshold, min_length=args.min_segment, max_gap=args.max_gap)
 
-    print("Performing structural alignment...")
-    annotated_img_path = human.annotate_3d_structure()
-    slide_1_img = Img(annotated_img_path, caption=human.pred_pdb_id)
+def _build_index(args):
+    from analysis import minimizer_index
+    from client.uniprot_client import UniProtClient
 
-    rmsd_map = human.structure_align(orthologs)
-    slide_3_imgs = []
-    for ortholog, (img_path, rmsd) in rmsd_map.items():
-        slide_3_imgs.append(Img(img_path, caption="Human:" + ortholog.organism.name.capitalize() + "\nRMSD: " + str(rmsd) + "Å"))
-    
-    
-    slide_4_img = _get_string_db_interactions(protein_name, human.string_id)
+    fastas = dict(args.fasta or [])
+    organisms = [Organism[name] for name in args.organism] if args.organism else list(fastas) or [o for o in Organism if o != Organism.HUMAN]
+    for organism in organisms:
+        fasta = fastas.get(organism)
+        if fasta is None:
+            fasta = minimizer_index.index_dir(organism) / "proteome.fasta"
+            fasta.parent.mkdir(parents=True, exist_ok=True)
+            count = UniProtClient().download_proteome(organism.taxon_id, fasta)
+            print(f"Downloaded {count} {organism.name} reference proteome sequences")
+        start = perf_counter()
+        index = minimizer_index.build(organism, fasta)
+        print(f"Indexed {index.counts.size} {organism.name} sequences ({index.keys.size} minimizers) in {perf_counter() - start:.1f}s")
 
-    print("Creating powerpoint...")
-    template_path = Path(__file__).parent.parent / "assets" / "template.pptx"
-    entry = Entry(template_path=template_path, human=human, orthologs=orthologs, user_name=f"{first_name} {last_name}")
-    entry.populate_info_table_slide(slide_1_img)
-    entry.populate_str_align_slide(slide_3_imgs)
-    entry.populate_string_db_slide(slide_4_img)
+def _parse_fasta(value) -> tuple:
+    organism, _, path = value.partition("=")
+    # only ortholog organisms are looked up in an index
+    if not path or organism.upper() not in Organism.__members__ or organism.upper() == Organism.HUMAN.name:
+        raise argparse.ArgumentTypeError(f"expected ORGANISM=path with an ortholog panel organism, got {value!r}")
+    return (Organism[organism.upper()], Path(path))
 
-    print("Completed")
+def _configure_workspace(args):
+    run_id = getattr(args, "run_id", None)
+    # shards on different nodes must land in the same run, so the run ID defaults to a hash of the CSV
+    if run_id is None and getattr(args, "shard", None) and getattr(args, "csv", None):
+        run_id = "batch_" + hashlib.sha1(Path(args.csv).read_bytes()).hexdigest()[:12]
+    workspace.configure(root=getattr(args, "output_root", None), run_id=run_id)
     
 def main():
-    parser = argparse.ArgumentParser(description="Protein passport automation")
-    
-    parser.add_argument("first_name", help="Your first name")
-    parser.add_argument("last_name", help="Your last name")
-
-    group = parser.add_mutually_exclusive_group(required=True)
+    targets = argparse.ArgumentParser(add_help=False)
+    group = targets.add_mutually_exclusive_group(required=True)
 
     group.add_argument(
         "--csv",
@@ -172,23 +260,176 @@ def main():
         help="Provide protein_name and protein_id directly"
     )
 
-    args = parser.parse_args()
+    targets.add_argument(
+        "--shard",
+        type=_parse_shard,
+        metavar="i/N",
+        help="Only process the i-th of N deterministic partitions of the targets (1-based)"
+    )
 
-    proteins = []
+    outputs = argparse.ArgumentParser(add_help=False)
+    outputs.add_argument("--output-root", help="Directory outputs are written under (default: PASSPORT_OUTPUT_ROOT or the project root)")
+    outputs.add_argument("--run-id", help="Isolate this run's outputs under <output-root>/<run-id> (default with --shard: a hash of the CSV)")
 
-    if args.csv:
-        with open(args.csv, newline="") as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                if len(row) >= 2:  
-                    proteins.append((row[0].strip(), row[1].strip()))
-    elif args.manual:
-        protein_name, protein_id = args.manual
-        proteins.append((protein_name, protein_id))
+    user = argparse.ArgumentParser(add_help=False)
+    user.add_argument("first_name", help="Your first name")
+    user.add_argument("last_name", help="Your last name")
+
+    # queue workers and the server run unattended, so only the stages run from a terminal can prompt
+    prompting = argparse.ArgumentParser(add_help=False)
+    prompting.add_argument(
+        "--interactive",
+        action="store_true",
+        help="Prompt for the ortholog when the UniRef and search hits disagree instead of choosing automatically"
+    )
+
+    selection = argparse.ArgumentParser(add_help=False)
+    selection.add_argument(
+        "--min-identity",
+        type=float,
+        default=MIN_ORTHOLOG_IDENTITY,
+        help=f"Minimum alignment identity to the human sequence for automatic ortholog selection (default: {MIN_ORTHOLOG_IDENTITY})"
+    )
+
+    aligning = argparse.ArgumentParser(add_help=False)
+    aligning.add_argument("--msa", choices=("native", "geneious"), default="native", help="Sequence aligner: the built-in progressive aligner or Geneious MUSCLE (default: native)")
+
+    cropping = argparse.ArgumentParser(add_help=False)
+    cropping.add_argument("--plddt-threshold", type=float, default=70.0, help="Crop residues below this AlphaFold pLDDT before alignment and rendering, 0 disables (default: 70)")
+    cropping.add_argument("--min-segment", type=int, default=10, help="Shortest confident segment kept when cropping (default: 10)")
+    cropping.add_argument("--max-gap", type=int, default=5, help="Low-confidence gaps up to this length are kept inside confident segments (default: 5)")
+
+    parser = argparse.ArgumentParser(description="Protein passport automation")
+    subparsers = parser.add_subparsers(dest="stage", required=True)
+    subparsers.add_parser("fetch", parents=[targets, outputs, prompting, selection], help="Fetch UniProt, annotation and AlphaFold data")
+    align = subparsers.add_parser("align", parents=[targets, outputs, aligning, cropping], help="Align sequences and structures of fetched proteins")
+    align.add_argument("--msa-workers", type=int, default=None, help="Processes the targets' sequence alignments are spread over (default: CPU count)")
+    subparsers.add_parser("render", parents=[targets, outputs, cropping], help="Render the annotated structure and STRING network")
+    subparsers.add_parser("deck", parents=[user, targets, outputs], help="Build the powerpoint from rendered outputs")
+    subparsers.add_parser("all", parents=[user, targets, outputs, prompting, selection, aligning, cropping], help="Run every stage")
+    subparsers.add_parser("merge", parents=[outputs], help="Combine the shard summaries of a run into summary.json")
+
+    export = subparsers.add_parser("export", parents=[targets, outputs], help="Write the annotated sequences of fetched targets as GenBank or GFF3+FASTA")
+    export.add_argument("--format", choices=("genbank", "gff3"), default="genbank", help="GenBank streams every target into one file, GFF3 writes a bundle per target (default: genbank)")
+    export.add_argument("--out", help="GenBank output path (default: <run dir>/annotated_sequences.gb)")
+
+    overview = subparsers.add_parser("overview", parents=[targets, outputs], help="Build one overview deck for a batch: summary table and a key slide per target")
+    overview.add_argument("--out", help="Deck path (default: <run dir>/batch_overview.pptx)")
+
+    query = subparsers.add_parser("query", parents=[outputs], help="Print results catalog rows (one per target and organism) as TSV")
+    query.add_argument("--organism", help="Only rows of this organism, e.g. MOUSE")
+    query.add_argument("--protein", help="Only rows of this target protein name")
+    query.add_argument("--rmsd-above", type=float, help="Only orthologs with an RMSD to the human model above this (Å)")
+    query.add_argument("--identity-below", type=float, help="Only orthologs with an identity to the human sequence below this (%%)")
+    query.add_argument("--where", help="Extra SQL condition over the catalog columns, e.g. \"length > 500\"")
+    query.add_argument("--limit", type=int, help="Maximum number of rows")
+    query.add_argument("--parquet", help="Write the rows to this Parquet file instead (requires pyarrow)")
+
+    index = subparsers.add_parser("index", parents=[outputs], help="Build the proteome minimizer indexes used to find orthologs by sequence")
+    index.add_argument("--organism", action="append", choices=[o.name for o in Organism if o != Organism.HUMAN], type=str.upper, help="Index this panel organism, repeatable (default: every ortholog organism, or those given by --fasta)")
+    index.add_argument("--fasta", action="append", type=_parse_fasta, metavar="ORGANISM=PATH", help="Proteome FASTA of an organism, repeatable (default: download the UniProt reference proteome)")
+
+    queue = argparse.ArgumentParser(add_help=False)
+    queue.add_argument("--queue", default=str(QUEUE_PATH), help=f"Path to the SQLite job queue (default: {QUEUE_PATH})")
+
+    subparsers.add_parser("enqueue", parents=[targets, queue], help="Add CSV or manual targets to the job queue")
+    work = subparsers.add_parser("work", parents=[user, queue, outputs, selection, aligning, cropping], help="Claim and build queued passports until the queue is drained")
+    work.add_argument("--lease", type=float, default=1800, help="Seconds a claimed job is reserved before other workers may take it over (default: 1800)")
+    work.add_argument("--max-attempts", type=int, default=3, help="Attempts before a job is marked failed (default: 3)")
+    subparsers.add_parser("status", parents=[queue], help="Show job queue progress and failures")
+    subparsers.add_parser("retry-failed", parents=[queue], help="Requeue failed jobs")
+
+    serve = subparsers.add_parser("serve", parents=[outputs, aligning, cropping], help="Run a long-lived passport service with warm connections, PyMOL and template")
+    serve.add_argument("--host", default="127.0.0.1", help="Host to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765, help="Port to bind (default: 8765)")
+    serve.add_argument("--socket", help="Unix socket path to bind instead of host/port")
+    serve.add_argument("--workers", type=int, default=2, help="Passports built concurrently (default: 2)")
+    serve.add_argument("--align-workers", type=int, default=None, help="PyMOL worker processes for structural alignment (default: CPU count)")
+    serve.add_argument("--min-identity", type=float, default=MIN_ORTHOLOG_IDENTITY, help="Minimum identity for automatic ortholog selection")
+
+    argv = sys.argv[1:]
+    # the stage-less form "main.py first last --csv ..." runs every stage
+    if argv and argv[0] not in subparsers.choices and argv[0] not in ("-h", "--help"):
+        argv = ["all", *argv]
+    args = parser.parse_args(argv)
+    _configure_workspace(args)
+
+    if args.stage == "serve":
+        return _serve(args)
+    if args.stage == "work":
+        return _work(args)
+    if args.stage == "status":
+        return _queue_status(args)
+    if args.stage == "retry-failed":
+        from storage.job_queue import JobQueue
+        return print(f"Requeued {JobQueue(args.queue).retry_failed()} failed jobs")
+    if args.stage == "enqueue":
+        from storage.job_queue import JobQueue
+        return print(f"Enqueued {JobQueue(args.queue).enqueue(_read_targets(args))} new jobs")
+    if args.stage == "query":
+        return _query_catalog(args)
+    if args.stage == "export":
+        return _export_sequences(args)
+    if args.stage == "index":
+        return _build_index(args)
+    if args.stage == "overview":
+        return _overview(args)
+    if args.stage == "merge":
+        if not args.run_id:
+            parser.error("merge requires --run-id")
+        merged = workspace.current().merge_shard_summaries()
+        failed = sum(1 for r in merged["results"] if r["status"] == "failed")
+        return print(f"Merged {len(merged['shards'])} shards: {len(merged['results'])} targets, {failed} failed")
+
+    results = []
+    string_interactions = None
+    alignments = {}
+    if args.stage == "align" and args.msa == "native":
+        # the targets' sequence alignments are spread over a process pool, one target per process
+        alignments = pipeline.prealign_sequences(_load_states(_read_targets(args)), max_workers=args.msa_workers)
+    if args.stage == "render":
+        # one batched STRING request for every target of the render stage
+        string_interactions = pipeline.prefetch_string_interactions(_load_states(_read_targets(args)))
+
+    try:
+        for protein_name, protein_id in _read_targets(args):
+            result = {"protein_name": protein_name, "protein_id": protein_id, "status": "done", "output_path": None, "timings": {}, "errors": []}
+            try:
+                if args.stage == "all":
+                    result["output_path"] = str(pipeline.run(protein_id, protein_name, f"{args.first_name} {args.last_name}", interactive=args.interactive, 
+                                                             min_identity=args.min_identity, timings=result["timings"], crop=_crop_settings(args), 
+                                                             errors=result["errors"], msa=args.msa))
+                elif args.stage == "fetch":
+                    state = pipeline.fetch(protein_id, protein_name, interactive=args.interactive, min_identity=args.min_identity)
+                elif args.stage == "align":
+                    state = pipeline.align(RunState.load(protein_name), crop=_crop_settings(args), msa=args.msa, alignment=alignments.get(protein_name))
+                elif args.stage == "render":
+                    state = pipeline.render(RunState.load(protein_name), string_interactions, crop=_crop_settings(args))
+                elif args.stage == "deck":
+                    state = RunState.load(protein_name)
+                    result["output_path"] = str(pipeline.deck(state, f"{args.first_name} {args.last_name}"))
+                if args.stage != "all":
+                    result["errors"] = state.errors
+                if result["errors"]:
+                    result["status"] = "degraded"
+            except Exception as e:
+                # one bad target must not cost the rest of the batch
+                print(f"{protein_name} failed: {type(e).__name__}: {e}")
+                result.update(status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+            results.append(result)
+    finally:
+        # decks of every target so far reach the results catalog, even if a target raised
+        catalog.flush_all()
 
-    for protein_name, protein_id in proteins:
-        _run(protein_id, protein_name, args.first_name, args.last_name)
+    if args.stage == "all" and args.shard:
+        print(f"Wrote {workspace.current().write_shard_summary(args.shard, results)}")
+    report = workspace.current().write_failure_report(results, args.stage, args.shard)
+    if report:
+        counts = {status: sum(1 for r in results if r["status"] == status) for status in ("done", "degraded", "failed")}
+        print(f"{counts['done']} complete, {counts['degraded']} degraded, {counts['failed']} failed targets, see {report}")
+    if any(result["status"] == "failed" for result in results):
+        sys.exit(1)
     
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,11 +1,31 @@
 from pptx import Presentation
-from pptx.util import Pt
+from pptx.util import Pt, Emu, Inches
 from pptx.dml.color import RGBColor
 from pathlib import Path
-from models.protein_model.human_protein import HumanProtein
+import csv
+from models.protein_model.human_protein import HumanProtein, msa_name
 from models.protein_model.ortholog import Ortholog
 from dataclasses import dataclass, field
+from copy import deepcopy
+from functools import lru_cache
+from io import BytesIO
 from models.image import Img
+from storage import workspace
+
+PARTNER_ROWS = 20
+
+@lru_cache(maxsize=4)
+def load_template(template_path: str) -> bytes:
+    """
+    Reads a pptx template once per process, so repeated passports skip the disk read.
+
+    Args:
+        template_path (str): Path of the template ppt.
+
+    Returns:
+        bytes: Template file content.
+    """
+    return Path(template_path).read_bytes()
 
 @dataclass
 class Entry:
@@ -17,6 +37,7 @@ class Entry:
         human (HumanProtein): HumanProtein of this Entry.
         orthologs (list): List of Orthologs of this Entry.
         user_name (str): User's name.
+        alignment (Alignment): Multiple sequence alignment of the human protein (first row) and the orthologs, or None.
         powerpoint (Presentation): Presentation object of this Entry.
         slides (Slides): Slides of this Entry's Presentation.
         table_cells (list): List containing text to fill table cells of first slide in this Entry.
@@ -26,6 +47,7 @@ class Entry:
     human: HumanProtein
     orthologs: list
     user_name: str
+    alignment: object = None
     powerpoint: Presentation = field(init=False)
     slides: list = field(init=False)
     table_cells: list = field(init=False)
@@ -35,12 +57,29 @@ class Entry:
         """
         Post init method for Entry. Sets powerpoint, slides, output_path, and table_cells fields.
         """
-        self.powerpoint = Presentation(self.template_path)
+        self.powerpoint = Presentation(BytesIO(load_template(str(self.template_path))))
         self.slides = self.powerpoint.slides
-        self.output_path = Path(__file__).parent.parent.parent / f"output_{self.human.name}" / f"{self.human.name}_protein_passport.pptx"
+        self.output_path = workspace.current().target_dir(self.human.name) / f"{self.human.name}_protein_passport.pptx"
         self._build_table_cells()
         self._set_footer()
 
+    @property
+    def conservation(self):
+        """
+        Gets the conservation of every alignment column (see Alignment.conservation), or None without an alignment.
+        """
+        return self.alignment.conservation() if self.alignment is not None else None
+
+    def _identity_text(self, ortholog: Ortholog) -> str:
+        """
+        Gets the identity of an ortholog to the human sequence in the alignment, or "%" to fill in by hand without one.
+        """
+        human, other = msa_name(self.human), msa_name(ortholog)
+        if self.alignment is None or human not in self.alignment.names or other not in self.alignment.names:
+            return "%"
+        identity = self.alignment.identity(self.alignment.names.index(human), self.alignment.names.index(other))
+        return f"{identity * 100:.1f}%"
+
     def _build_table_cells(self):
         """
         Sets table_cells field.
@@ -57,10 +96,10 @@ class Entry:
                 f"{self.human.passport_table_data['length']} aa {self.human.passport_table_data['mass']} kDa",
                 ""
             ],
-            [f"{o.organism.value[0]}: %" for o in self.orthologs],
+            [f"{o.organism.display_name}: {self._identity_text(o)}" for o in self.orthologs],
             [
                 f"Experimental PDBs: {', '.join(self.human.passport_table_data['exp_pdbs'])}",
-                f"Predicted: {self.human.pred_pdb_id}"
+                f"Predicted: {self.human.pred_pdb_id or 'none'}"
             ],
             [f"{self.human.passport_table_data['exp_pattern']}."],
             [f"{self.human.passport_table_data['known_activity']}."]
@@ -81,7 +120,7 @@ class Entry:
         Populates the first slide of protein passport ppt template.
 
         Args:
-            img (Img): Human protein 3d structure image.
+            img (Img): Human protein 3d structure image, or None if there is no model.
         """
         slide = self.slides[0]
 
@@ -98,11 +137,11 @@ class Entry:
         if title:
             title.text = "Protein Passport - " + self.human.name
 
-        if picture:
+        if picture and img:
             img.vertical()
             picture.insert_picture(img.path)
         
-        if pbd_id_caption:
+        if pbd_id_caption and img:
             pbd_id_caption.text = img.caption
             pbd_id_caption.text_frame.paragraphs[0].runs[0].font.size = Pt(14)
         
@@ -119,17 +158,28 @@ class Entry:
 
         self.powerpoint.save(self.output_path)
     
-    def populate_hu_seq_slide(self):
+    def populate_hu_seq_slide(self, img: Img = None):
         """
         Populates the second slide of protein passport ppt template.
+
+        Args:
+            img (Img): Annotated human sequence image (see render.sequence_image), sized for the slide's picture placeholder.
         """
         slide = self.slides[1]
+        title = picture = None
         for shape in slide.shapes:
             if 'Title' in shape.name:
                 title = shape
+            if 'Picture' in shape.name:
+                picture = shape
         
         if title:
-            title.text = self.human.name + "Human Seq Annotated"
+            title.text = self.human.name + " Human Seq Annotated"
+
+        if picture and img:
+            picture.insert_picture(img.path)
+
+        self.powerpoint.save(self.output_path)
 
     
     def populate_str_align_slide(self, align_imgs: list, seq_img: Img=None):
@@ -161,50 +211,142 @@ class Entry:
             if 'TextBox' in shape.name and len(textboxes) < 4:
                 textboxes.append(shape)
         
-        zipped = zip(placeholders[1:], pictures)
-        for z in zipped:
-            z[0].insert_picture(z[1])
-
-        zipped = zip(textboxes, captions)
-        for z in zipped:
-            z[0].text = z[1]
-            for paragraph in z[0].text_frame.paragraphs:
-                for run in paragraph.runs:
-                    run.font.size = Pt(14)
+        font_size = Pt(14) if len(self.orthologs) <= 4 else Pt(max(8, 14 - (len(self.orthologs) - 4) // 2))
+
+        if len(pictures) <= len(placeholders[1:]):
+            zipped = zip(placeholders[1:], pictures)
+            for z in zipped:
+                z[0].insert_picture(z[1])
+
+            zipped = zip(textboxes, captions)
+            for z in zipped:
+                z[0].text = z[1]
+                for paragraph in z[0].text_frame.paragraphs:
+                    for run in paragraph.runs:
+                        run.font.size = Pt(14)
+        else:
+            self._tile_pictures(slide, placeholders[1:], textboxes, pictures, captions)
 
         if table:
+            self._fit_table_rows(table, len(self.orthologs) + 2)
+
             cell = table.cell(1, 1)
             cell.text = self.human.id
-            cell.text_frame.paragraphs[0].runs[0].font.size = Pt(14)
+            cell.text_frame.paragraphs[0].runs[0].font.size = font_size
 
             for i, ortholog in enumerate(self.orthologs, start=2):
                 species_cell = table.cell(i, 0)
                 species_cell.text = ortholog.organism.name.capitalize()
-                species_cell.text_frame.paragraphs[0].runs[0].font.size = Pt(14)
+                species_cell.text_frame.paragraphs[0].runs[0].font.size = font_size
 
                 id_cell = table.cell(i, 1)
                 id_cell.text = ortholog.id
-                id_cell.text_frame.paragraphs[0].runs[0].font.size = Pt(14)
+                id_cell.text_frame.paragraphs[0].runs[0].font.size = font_size
 
                 similarity_cell = table.cell(i, 2)
-                similarity_cell.text = "%"
-                similarity_cell.text_frame.paragraphs[0].runs[0].font.size = Pt(14)
+                similarity_cell.text = self._identity_text(ortholog)
+                similarity_cell.text_frame.paragraphs[0].runs[0].font.size = font_size
 
         self.powerpoint.save(self.output_path)
     
-    def populate_string_db_slide(self, network_img: str, pred_partners_img=None):
+    def populate_string_db_slide(self, network_img: str, partners_path: str = None):
         """
         Populates the fourth slide of protein passport ppt template.
 
         Args:
             network_img (str): path to STRING network image.
-            pred_partners_img (str): path to STRING predicted partners.
+            partners_path (str): path to STRING partner table (TSV with partner, string_id, score).
         """
         slide = self.slides[3]
         
-        slide.shapes.add_picture(network_img, left=1, top=1)
-        # placeholders[1].insert_picture(pred_partners_img)
+        if network_img:
+            slide.shapes.add_picture(network_img, left=Inches(0.4), top=Inches(1.0), height=Inches(5.3))
+
+        if partners_path:
+            with open(partners_path, newline="") as fh:
+                partners = list(csv.DictReader(fh, delimiter="\t"))[:PARTNER_ROWS]
+
+            if partners:
+                shape = slide.shapes.add_table(len(partners) + 1, 2, Inches(8.3), Inches(1.0), Inches(4.6), Inches(0.25) * (len(partners) + 1))
+                table = shape.table
+                for col, header in enumerate(("Partner", "Score")):
+                    table.cell(0, col).text = header
+                for i, partner in enumerate(partners, start=1):
+                    table.cell(i, 0).text = partner["partner"]
+                    table.cell(i, 1).text = partner["score"]
+                for row in table.rows:
+                    row.height = Inches(0.25)
+                    for cell in row.cells:
+                        for paragraph in cell.text_frame.paragraphs:
+                            for run in paragraph.runs:
+                                run.font.size = Pt(10)
 
         self.powerpoint.save(self.output_path)
-    
-    
\ No newline at end of file
+
+    def remove_slides(self, indices: list):
+        """
+        Removes template slides that have nothing to show, e.g. the structure alignment slide without
+        AlphaFold models. Call after populating, since removal shifts the slide indices.
+
+        Args:
+            indices (list): Indices of the slides to remove.
+        """
+        slide_ids = self.powerpoint.slides._sldIdLst
+        for index in sorted(set(indices), reverse=True):
+            slide_id = slide_ids[index]
+            self.powerpoint.part.drop_rel(slide_id.rId)
+            slide_ids.remove(slide_id)
+        self.powerpoint.save(self.output_path)
+
+    def _fit_table_rows(self, table, n_rows: int):
+        """
+        Grows or shrinks a table to n_rows by cloning or removing its last row, keeping the table's total height.
+
+        Args:
+            table (Table): Table to resize.
+            n_rows (int): Number of rows needed.
+        """
+        tbl = table._tbl
+        total_height = sum(row.height for row in table.rows)
+
+        while len(tbl.tr_lst) < n_rows:
+            tbl.append(deepcopy(tbl.tr_lst[-1]))
+        while len(tbl.tr_lst) > n_rows:
+            tbl.remove(tbl.tr_lst[-1])
+
+        for row in table.rows:
+            row.height = Emu(total_height // n_rows)
+
+    def _tile_pictures(self, slide, placeholders: list, textboxes: list, pictures: list, captions: list):
+        """
+        Lays out more pictures than the template has placeholders in a grid over the placeholders' area.
+
+        Args:
+            slide (Slide): Slide to add pictures to.
+            placeholders (list): Picture placeholders whose area is reused.
+            textboxes (list): Caption textboxes of the placeholders.
+            pictures (list): Image paths.
+            captions (list): Image captions.
+        """
+        left = min(p.left for p in placeholders)
+        top = min(p.top for p in placeholders)
+        width = max(p.left + p.width for p in placeholders) - left
+        height = max(p.top + p.height for p in placeholders) - top
+
+        for shape in [*placeholders, *textboxes]:
+            shape._element.getparent().remove(shape._element)
+
+        cols = -(-len(pictures) // 2) if len(pictures) <= 8 else -(-len(pictures) // 3)
+        rows = -(-len(pictures) // cols)
+        cell_w, cell_h = width // cols, height // rows
+        caption_h = cell_h // 5
+
+        for i, (picture, caption) in enumerate(zip(pictures, captions)):
+            x = left + (i % cols) * cell_w
+            y = top + (i // cols) * cell_h
+            slide.shapes.add_picture(picture, x, y, height=cell_h - caption_h)
+            textbox = slide.shapes.add_textbox(x, y + cell_h - caption_h, cell_w, caption_h)
+            textbox.text = caption
+            for paragraph in textbox.text_frame.paragraphs:
+                for run in paragraph.runs:
+                    run.font.size = Pt(9)
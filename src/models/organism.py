@@ -1,11 +1,41 @@
+import json, os
 from enum import Enum
+from pathlib import Path
 
-class Organism(Enum):
+PANEL_PATH = Path(os.environ.get("PASSPORT_PANEL", Path(__file__).parent.parent.parent / "assets" / "organisms.json"))
+
+class _PanelOrganism(Enum):
+    """
+    Base for the Organism enum built from the species panel config.
+    """
+
+    @property
+    def display_name(self) -> str:
+        return self.value[0]
+
+    @property
+    def taxon_id(self) -> int:
+        return self.value[1]
+
+def _load_panel(path: Path) -> list:
     """
-    Represents an organism.
+    Reads the species panel config.
+
+    Args:
+        path (Path): JSON file with a list of {name, display_name, taxon_id} objects.
+
+    Returns:
+        list: (member name, (display name, taxon ID)) pairs.
+    """
+    panel = json.loads(Path(path).read_text())
+    members = [(o["name"].upper(), (o["display_name"], int(o["taxon_id"]))) for o in panel]
+
+    if "HUMAN" not in (name for name, _ in members):
+        raise ValueError(f"Species panel {path} must contain a HUMAN entry")
+
+    return members
+
+Organism = _PanelOrganism("Organism", _load_panel(PANEL_PATH), module=__name__, qualname="Organism")
+Organism.__doc__ = """
+    Represents an organism of the species panel (loaded from PASSPORT_PANEL, default assets/organisms.json).
     """
-    HUMAN = ('Homo sapiens', 9606)
-    MOUSE = ('Mus musculus', 10090)
-    ALPACA = ('Vicugna pacos', 30538)
-    CYNO = ('Macaca fascicularis', 9541)
-    CHICKEN = ('Gallus gallus', 9031)
\ No newline at end of file
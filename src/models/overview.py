@@ -0,0 +1,222 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches, Pt
+from models.entry import load_template
+from models.organism import Organism
+from storage import artifacts
+
+THUMBNAIL_SIZE = (1200, 1200)
+ROWS_PER_SLIDE = 14
+
+def thumbnail(path: str, cache_dir: Path, max_size: tuple = THUMBNAIL_SIZE) -> str:
+    """
+    Gets a downscaled JPEG copy of an image, cached by the content digest of the source, so identical
+    images share one file (and one media part in the deck) and reruns skip the resize.
+
+    Args:
+        path (str): Source image path.
+        cache_dir (Path): Thumbnail directory.
+        max_size (tuple): Maximum (width, height) in pixels.
+
+    Returns:
+        str: Thumbnail path.
+    """
+    digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    out = cache_dir / f"{digest[:20]}_{max_size[0]}x{max_size[1]}.jpg"
+    if not out.exists():
+        with Image.open(path) as img:
+            img.thumbnail(max_size)
+            data = BytesIO()
+            img.convert("RGB").save(data, "JPEG", quality=85, optimize=True)
+        # threads shrinking identical images each write through their own temporary file
+        artifacts.atomic_write(out, data.getvalue())
+    return str(out)
+
+def target_summary(state) -> dict:
+    """
+    Reduces a target's RunState to what the overview shows, so the state itself can be dropped.
+
+    Args:
+        state (RunState): Target state.
+
+    Returns:
+        dict: Name, key facts, per-organism (RMSD, identity) and the structure image path.
+    """
+    human = state.human
+    data = human.passport_table_data
+    return {
+        "protein_name": state.protein_name,
+        "accession": human.id,
+        "rec_name": data["rec_name"],
+        "target_type": data["target_type"] or "",
+        "length": data["length"],
+        "mass": data["mass"],
+        "exp_pdbs": data["exp_pdbs"] or [],
+        "pred_pdb_id": human.pred_pdb_id,
+        "orthologs": {o.organism.name: (o.rmsd, getattr(o, "similarity", None)) for o in state.orthologs},
+        "structure_img": state.structure_img,
+        "errors": len(state.errors),
+    }
+
+def _cell(table, row: int, col: int, text: str, size: Pt):
+    cell = table.cell(row, col)
+    cell.text = text
+    for paragraph in cell.text_frame.paragraphs:
+        for run in paragraph.runs:
+            run.font.size = size
+
+def _ortholog_text(value: tuple) -> str:
+    rmsd, identity = value
+    parts = [f"{rmsd} Å" if rmsd is not None else "–", f"{identity}%" if identity is not None else "–"]
+    return " / ".join(parts)
+
+class OverviewDeck():
+    """
+    Represents a batch overview deck: a summary table over every target, then one key slide per target.
+    Slides are added one at a time from target summaries and downscaled images; python-pptx stores each
+    distinct image once, so media shared between targets is not duplicated.
+
+    Attributes:
+        presentation (Presentation): Deck, on the passport template's theme without its slides.
+        organisms (list): Ortholog organism names, one summary column each.
+    """
+    presentation: Presentation
+    organisms: list
+
+    def __init__(self, template_path: str, organisms: list | None = None):
+        """
+        Constructor for OverviewDeck.
+
+        Args:
+            template_path (str): Passport template, for its theme and layouts.
+            organisms (list): Ortholog organism names (defaults to the panel).
+        """
+        self.presentation = Presentation(BytesIO(load_template(str(template_path))))
+        self.organisms = organisms or [o.name for o in Organism if o != Organism.HUMAN]
+
+        slide_ids = self.presentation.slides._sldIdLst
+        for slide_id in list(slide_ids):
+            self.presentation.part.drop_rel(slide_id.rId)
+            slide_ids.remove(slide_id)
+
+        layouts = self.presentation.slide_layouts
+        self._title_only = next((layout for layout in layouts if layout.name == "Title Only"), layouts[5])
+
+    def _slide(self, title: str):
+        slide = self.presentation.slides.add_slide(self._title_only)
+        if slide.shapes.title:
+            slide.shapes.title.text = title
+        return slide
+
+    def add_summary(self, summaries: list, failed: list = (), title: str = "Batch overview"):
+        """
+        Adds summary table slides, ROWS_PER_SLIDE targets each.
+
+        Args:
+            summaries (list): Target summaries (see target_summary).
+            failed (list): (protein_name, protein_id) of targets without results.
+            title (str): Slide title.
+        """
+        header = ["Target", "Type", "Length", *(o.capitalize() for o in self.organisms)]
+        rows = [[s["protein_name"] + (" *" if s["errors"] else ""), str(s["target_type"]), f"{s['length']} aa",
+                 *(_ortholog_text(s["orthologs"][o]) if o in s["orthologs"] else "" for o in self.organisms)]
+                for s in summaries]
+        rows += [[name, "failed", "", *("" for _ in self.organisms)] for name, _ in failed]
+
+        font = Pt(11) if len(header) <= 8 else Pt(max(7, 11 - (len(header) - 8) // 2))
+        pages = max(1, -(-len(rows) // ROWS_PER_SLIDE))
+        for page in range(pages):
+            chunk = rows[page * ROWS_PER_SLIDE:(page + 1) * ROWS_PER_SLIDE]
+            slide = self._slide(f"{title} ({page + 1}/{pages})" if pages > 1 else title)
+            table = slide.shapes.add_table(len(chunk) + 1, len(header), Inches(0.4), Inches(1.2), Inches(12.5),
+                                           Inches(0.3) * (len(chunk) + 1)).table
+            for col, text in enumerate(header):
+                _cell(table, 0, col, text, font)
+            for row, values in enumerate(chunk, start=1):
+                for col, text in enumerate(values):
+                    _cell(table, row, col, text, font)
+
+            note = slide.shapes.add_textbox(Inches(0.4), Inches(6.9), Inches(12), Inches(0.4)).text_frame
+            note.text = "Ortholog cells: RMSD to the human model / sequence identity. * built with missing parts, see failure_report.json"
+            note.paragraphs[0].runs[0].font.size = Pt(9)
+
+    def add_target(self, summary: dict, structure_thumbnail: str | None):
+        """
+        Adds the key slide of a target: structure image and its facts.
+
+        Args:
+            summary (dict): Target summary (see target_summary).
+            structure_thumbnail (str): Downscaled structure image, or None.
+        """
+        slide = self._slide(f"{summary['protein_name']} – {summary['rec_name']}")
+
+        if structure_thumbnail:
+            picture = slide.shapes.add_picture(structure_thumbnail, Inches(0.4), Inches(1.2), height=Inches(5.6))
+            if picture.width > Inches(6.6):
+                # wide images are fitted to the space left of the facts table
+                scale = Inches(6.6) / picture.width
+                picture.width, picture.height = Inches(6.6), int(picture.height * scale)
+
+        facts = [
+            ("UniProtKB", summary["accession"]),
+            ("Type", str(summary["target_type"])),
+            ("Size", f"{summary['length']} aa, {summary['mass']} kDa"),
+            ("Experimental PDBs", ", ".join(summary["exp_pdbs"][:8]) + (" …" if len(summary["exp_pdbs"]) > 8 else "")),
+            ("Predicted", summary["pred_pdb_id"] or "none"),
+            *((o.capitalize(), _ortholog_text(summary["orthologs"][o])) for o in self.organisms if o in summary["orthologs"]),
+        ]
+        table = slide.shapes.add_table(len(facts), 2, Inches(7.2), Inches(1.2), Inches(5.7), Inches(0.32) * len(facts)).table
+        for row, (label, value) in enumerate(facts):
+            _cell(table, row, 0, label, Pt(12))
+            _cell(table, row, 1, value, Pt(12))
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.presentation.save(path)
+        return path
+
+def build_overview(states, output_path, template_path: str, workers: int = 8) -> Path:
+    """
+    Builds a batch overview deck. Target states are reduced to summaries as they are read, so only the
+    summaries and the downscaled images in the deck are held in memory; images are downscaled in a thread pool.
+
+    Args:
+        states (iterable): (protein_name, protein_id, RunState or None for a failed target) tuples, read lazily.
+        output_path (str | Path): Deck path.
+        template_path (str): Passport template.
+        workers (int): Threads downscaling images.
+
+    Returns:
+        Path: Deck path.
+    """
+    output_path = Path(output_path)
+    cache_dir = output_path.parent / "overview_media"
+
+    summaries, failed = [], []
+    for protein_name, protein_id, state in states:
+        if state is None or state.human is None:
+            failed.append((protein_name, protein_id))
+        else:
+            summaries.append(target_summary(state))
+
+    deck = OverviewDeck(template_path)
+    deck.add_summary(summaries, failed)
+
+    def shrink(summary):
+        try:
+            return thumbnail(summary["structure_img"], cache_dir) if summary["structure_img"] else None
+        except OSError:
+            # image moved or unreadable, the key slide is still useful without it
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # map keeps target order while later thumbnails are already being made
+        for summary, structure_thumbnail in zip(summaries, executor.map(shrink, summaries)):
+            deck.add_target(summary, structure_thumbnail)
+
+    return deck.save(output_path)
@@ -0,0 +1,69 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+
+class FileCache():
+    """
+    Size-bounded LRU cache of values loaded from files (sequences, annotations, coordinates).
+    Least recently used entries are evicted once the total size exceeds max_bytes.
+
+    Attributes:
+        max_bytes (int): Maximum total size of cached values.
+        size (int): Current total size of cached values.
+    """
+    max_bytes: int
+    size: int
+
+    def __init__(self, max_bytes: int):
+        """
+        Constructor for FileCache.
+
+        Args:
+            max_bytes (int): Maximum total size of cached values.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: tuple, loader, sizer=len):
+        """
+        Gets a cached value, loading and caching it on a miss.
+
+        Args:
+            key (tuple): Cache key, (file path, kind).
+            loader (callable): Loads the value from disk.
+            sizer (callable): Estimates the size of the value in bytes.
+
+        Returns:
+            Cached value.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        value = loader()
+        size = sizer(value)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.size += size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+        return value
+
+    def evict(self, path: str):
+        """
+        Drops all cached values loaded from the given file.
+
+        Args:
+            path (str): File path.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self.size -= self._entries.pop(key)[1]
+
+file_cache = FileCache(int(os.environ.get("PASSPORT_CACHE_BYTES", 64 * 1024 * 1024)))
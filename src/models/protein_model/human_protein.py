@@ -1,5 +1,7 @@
 from models.protein_model.protein import Protein
 from models.organism import Organism
+from storage import artifacts
+from storage.sequence_export import write_genbank
 import subprocess
 
 class HumanProtein(Protein):
@@ -13,14 +15,14 @@ class HumanProtein(Protein):
         string_id (str): STRING database ID.
         file_name (Path): Path to this protein's directory.
         seq (str): Path to .fasta containing amino acid sequence.
-        annotations (dict): Protein annotations.
+        sequence (str): Amino acid sequence (lazily loaded from seq).
+        annotations (dict): Protein annotations (lazily loaded from annotations_path).
         annotations_path (str): Path to .gff containing annotations.
         pred_pdb (str): Path to predicted structure PDB.
         pred_pdb_id (str): AlphaFold ID.
-        structure_file (str): Path to PDB file.
         passport_table_data (dict): Data to fill the info table for protein passport.
-        fasta (str): FASTA sequence.
     """
+    __slots__ = ("passport_table_data",)
 
     def __init__(self, id: str, name: str, seq: str, annotations: str, pred_pdb: str, 
                  pred_pdb_content, length: int, mass: float, rec_name: str, target_type: str, 
@@ -65,22 +67,22 @@ class HumanProtein(Protein):
         id=uniprot_results['primaryAccession']
         name=protein_name
         seq=uniprot_results['sequence']['value']
-        pred_pdb = af_results['file_name']
-        pred_pdb_content = af_results['content']
+        pred_pdb = af_results.get('file_name')
+        pred_pdb_content = af_results.get('content')
 
         rec_name=uniprot_results['proteinDescription']['recommendedName']['fullName']['value']
         aliases = [item["fullName"]["value"] for item in uniprot_results.get("proteinDescription", {}).get("alternativeNames", [])] or ""
         length=uniprot_results['sequence']['length']
         mass=round(uniprot_results['sequence']['molWeight'] * 10**-3, 1)
-        exp_pdbs=[entry["id"] for entry in uniprot_results['uniProtKBCrossReferences'] if entry["database"] == "PDB"]
-        string_id=[entry["id"] for entry in uniprot_results['uniProtKBCrossReferences'] if entry["database"] == "STRING"]
+        exp_pdbs=[entry["id"] for entry in uniprot_results.get('uniProtKBCrossReferences', []) if entry["database"] == "PDB"]
+        string_id=[entry["id"] for entry in uniprot_results.get('uniProtKBCrossReferences', []) if entry["database"] == "STRING"]
                 
-        comments=uniprot_results['comments']
+        comments=uniprot_results.get('comments', [])
                 
         subcellular_location = next((d for d in comments if d.get('commentType') == 'SUBCELLULAR LOCATION'), None)
         if subcellular_location:
             locations = subcellular_location.get('subcellularLocations', [])
-            if locations[0].get('topology'):
+            if locations and locations[0].get('topology'):
                 subcellular_location = locations[0].get('topology').get('value')
             else:
                 subcellular_location = ""
@@ -88,14 +90,12 @@ class HumanProtein(Protein):
         function = next((d for d in comments if d.get('commentType') == 'FUNCTION'), None)
         if function:
             texts = function.get('texts', [])
-            if texts:
-                function = texts[0].get('value')
+            function = texts[0].get('value') if texts else ""
                 
         tissue_specificity = next((d for d in comments if d.get('commentType') == 'TISSUE SPECIFICITY'), None)
         if tissue_specificity:
             texts = tissue_specificity.get('texts', [])
-            if texts:
-                tissue_specificity = texts[0].get('value')
+            tissue_specificity = texts[0].get('value') if texts else ""
 
         return cls(id=id,
                    name=name,
@@ -114,26 +114,71 @@ class HumanProtein(Protein):
                    string_id=string_id,
                    fasta=fasta)
     
+    def _write_annotated_genbank(self):
+        """
+        Writes the annotated human sequence as GenBank to annotated_seq_human.gb.
+
+        Returns:
+            Path: GenBank path.
+        """
+        seq_output_file = self.file_name.parent / "annotated_seq_human.gb"
+        with open(seq_output_file, "w") as fh:
+            write_genbank([self], fh)
+        return seq_output_file
+
+    def annotate_align_seq(self, proteins: list, executor=None, alignment=None):
+        """
+        Annotates and aligns the given proteins with this HumanProtein using the built-in progressive aligner.
+        Creates annotated_seq_human.gb, alignment.fasta and alignment.aln (Clustal).
+
+        Args:
+            proteins (list): Proteins to be annotated and aligned with this HumanProtein.
+            executor (Executor): Process pool for the pairwise alignments, None for one per call.
+            alignment (Alignment): Alignment of this protein and the given proteins computed beforehand, e.g. by msa.align_batch.
+
+        Returns:
+            str: Path to the aligned FASTA, rows in the order human, *proteins.
+        """
+        from analysis import msa
+
+        self._write_annotated_genbank()
+        if alignment is None:
+            alignment = msa.align(*msa_panel([self, *proteins]), executor=executor)
+        alignment.write(self.file_name.parent / "alignment.aln")
+        return alignment.write(self.file_name.parent / "alignment.fasta")
+
     def annotate_align_seq_geneious(self, proteins: list):
         """
-        Annotates and aligns the given proteins against this HumanProtein using GeneiousPrime. 
-        Creates output .geneious files containing annotations and alignment.
+        Annotates and aligns the given proteins against this HumanProtein. The annotated human sequence is
+        written in-process as GenBank, and GeneiousPrime aligns the orthologs against it.
+        Creates annotated_seq_human.gb and an alignment.geneious file.
 
         Args:
             proteins (list): Proteins to be annotated and aligned against this HumanProtein.
         """
-        seq_output_file = self.file_name.parent / "annotated_seq_human.geneious"
+        seq_output_file = self._write_annotated_genbank()
         align_output_file = self.file_name.parent / "alignment.geneious"
 
-        annotate_command = ["geneious", "-i", self.seq, self.annotations_path, "-o", str(seq_output_file)]
-        subprocess.run(annotate_command, capture_output=True, text=True)
+        store = artifacts.current()
 
-        protein_seq_paths = [p.file_name / f"{p.organism.name}_{p.id}_seq.fasta" for p in proteins]
+        protein_seq_paths = [store.materialize(p.seq) for p in proteins]
 
         align_command = ["geneious", "-i", str(seq_output_file), 
                          *map(str, protein_seq_paths), "-o", str(align_output_file),
                          "--operation", "muscle_alignment"]
         subprocess.run(align_command, capture_output=True, text=True)
 
-        
+def msa_name(protein: Protein) -> str:
+    return f"{protein.organism.name.capitalize()}_{protein.id}"
 
+def msa_panel(proteins: list) -> tuple:
+    """
+    Gets the names and sequences of proteins to align.
+
+    Args:
+        proteins (list): Proteins, human first.
+
+    Returns:
+        tuple: (names, sequences), named Organism_accession.
+    """
+    return ([msa_name(p) for p in proteins], [p.sequence for p in proteins])
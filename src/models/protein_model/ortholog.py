@@ -12,15 +12,15 @@ class Ortholog(Protein):
         string_id (str): STRING database ID.
         file_name (Path): Path to this protein's directory.
         seq (str): Path to .fasta containing amino acid sequence.
-        annotations (dict): Protein annotations.
+        sequence (str): Amino acid sequence (lazily loaded from seq).
+        annotations (dict): Protein annotations (lazily loaded from annotations_path).
         annotations_path (str): Path to .gff containing annotations.
         pred_pdb (str): Path to predicted structure PDB.
         pred_pdb_id (str): AlphaFold ID.
-        structure_file (str): Path to PDB file.
         similarity (float): % similarity to human protein.
         rmsd (float): RMSD of against human protein.
-        fasta (str): FASTA sequence.
     """
+    __slots__ = ("similarity", "rmsd")
 
     def __init__(self, id: str, organism: Organism, name: str, seq: str, annotations: str, pred_pdb: str, 
                  pred_pdb_content, string_id: str, fasta: str):
@@ -41,6 +41,7 @@ class Ortholog(Protein):
         super().__init__(id=id, organism=organism, name=name, seq=seq, annotations=annotations, pred_pdb=pred_pdb, 
                          pred_pdb_content=pred_pdb_content, string_id=string_id, fasta=fasta)
         self.similarity = None
+        self.rmsd = None
     
     @classmethod
     def from_uniprot_result(cls, protein_name, uniprot_results, af_results, annotations_text, organism, fasta):
@@ -48,10 +49,10 @@ class Ortholog(Protein):
         name=protein_name
         seq=uniprot_results['sequence']['value']
 
-        pred_pdb = af_results['file_name']
-        pred_pdb_content = af_results['content']
+        pred_pdb = af_results.get('file_name')
+        pred_pdb_content = af_results.get('content')
         
-        string_id=[entry["id"] for entry in uniprot_results['uniProtKBCrossReferences'] if entry["database"] == "STRING"]
+        string_id=[entry["id"] for entry in uniprot_results.get('uniProtKBCrossReferences', []) if entry["database"] == "STRING"]
 
 
         return cls(id=id, 
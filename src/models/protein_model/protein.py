@@ -3,7 +3,56 @@ from pathlib import Path
 from abc import ABC
 from models.organism import Organism
 from models.annotation import Annotation
-from pymol import cmd
+from models.protein_model.file_cache import file_cache
+from storage import workspace, artifacts
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from threading import Lock
+
+_worker_pymol = None
+# the in-process PyMOL (pymol.cmd) is a single global session
+_pymol_lock = Lock()
+
+def init_pymol_worker():
+    """
+    Starts the PyMOL instance of a structure alignment worker process.
+    """
+    global _worker_pymol
+    import pymol2
+    _worker_pymol = pymol2.PyMOL()
+    _worker_pymol.start()
+
+def _align_pair(target: tuple, mobile: tuple, png_path: str, pse_path: str) -> float:
+    """
+    Aligns one mobile structure onto the target in this worker's PyMOL instance and saves a snapshot and session.
+
+    Args:
+        target (tuple): (object name, PDB path, start residue, end residue) of the target.
+        mobile (tuple): (object name, PDB path, start residue, end residue) of the mobile structure.
+        png_path (str): Snapshot output path.
+        pse_path (str): Session output path.
+
+    Returns:
+        float: RMSD after alignment.
+    """
+    pymol_cmd = _worker_pymol.cmd
+
+    for (name, path, start, end) in (target, mobile):
+        pymol_cmd.load(path, name)
+        pymol_cmd.select(f"{name}_sele", f"{name} and resi {start}-{end}")
+        pymol_cmd.create(f"{name}_chain", f"{name}_sele")
+        pymol_cmd.delete(f"{name}_sele")
+        pymol_cmd.delete(f"{name}")
+
+    result = pymol_cmd.align(f"polymer and name CA and {mobile[0]}_chain", f"polymer and name CA and {target[0]}_chain")
+
+    pymol_cmd.color("green", f"{target[0]}_chain")
+    pymol_cmd.zoom()
+    pymol_cmd.png(png_path, width=3000, ray=1)
+    pymol_cmd.save(pse_path)
+    pymol_cmd.delete("all")
+
+    return result[0]
 
 class Protein(ABC):
     """
@@ -16,13 +65,14 @@ class Protein(ABC):
         string_id (str): STRING database ID.
         file_name (Path): Path to this protein's directory.
         seq (str): Path to .fasta containing amino acid sequence.
-        annotations (dict): Protein annotations.
+        sequence (str): Amino acid sequence (lazily loaded from seq).
+        annotations (dict): Protein annotations (lazily loaded from annotations_path).
         annotations_path (str): Path to .gff containing annotations.
-        pred_pdb (str): Path to predicted structure PDB.
-        pred_pdb_id (str): AlphaFold ID.
-        structure_file (str): Path to PDB file.
-        fasta (str): FASTA sequence.
+        pred_pdb (str): Path to predicted structure PDB, or None if AlphaFold has no model.
+        pred_pdb_id (str): AlphaFold ID, or None if AlphaFold has no model.
+        pred_pdb_content (bytes): 3d coordinates of protein (lazily loaded from pred_pdb).
     """
+    __slots__ = ("id", "organism", "name", "string_id", "file_name", "seq", "annotations_path", "pred_pdb", "pred_pdb_id")
 
     def __init__(self, id: str, organism: Organism, name: str, seq: str, annotations: str, pred_pdb: str, pred_pdb_content, string_id: str, fasta: str):
         """
@@ -44,122 +94,256 @@ class Protein(ABC):
         self.name = name
         self.string_id = string_id
 
-        project_root = Path(__file__).parent.parent.parent.parent
-        self.file_name = project_root / f"output_{name}" / f"{self.organism.name.lower()}_{self.name}"
+        self.file_name = workspace.current().target_dir(name) / f"{self.organism.name.lower()}_{self.name}"
         self.file_name.mkdir(parents=True, exist_ok=True)
 
         self._set_save_seq(fasta)
         self._set_save_annotations(annotations)
         self._set_save_af_pdb(pred_pdb, pred_pdb_content)
+
+    @property
+    def sequence(self) -> str:
+        """
+        Amino acid sequence, loaded from this Protein's .fasta on first access and cached.
+        """
+        def load():
+            lines = artifacts.current().read(self.seq).decode().splitlines()
+            return "".join(line.strip() for line in lines if not line.startswith(">"))
+        return file_cache.get((self.seq, "sequence"), load)
+
+    @property
+    def annotations(self) -> dict:
+        """
+        Annotation residue ranges, loaded from this Protein's renamed .gff on first access and cached.
+        """
+        def load():
+            annotations_dict = defaultdict(list)
+            for line in artifacts.current().read(self.annotations_path).decode().splitlines():
+                parts = line.split("\t")
+                if line.startswith("#") or len(parts) < 9 or parts[2] not in Annotation.__members__:
+                    continue
+                annotations_dict[Annotation[parts[2]]].append((parts[3], parts[4]))
+            return annotations_dict
+        return file_cache.get((self.annotations_path, "annotations"), load, 
+                              sizer=lambda d: 64 * sum(len(v) for v in d.values()) + 64)
+
+    @property
+    def pred_pdb_content(self) -> bytes:
+        """
+        Predicted structure PDB content, loaded from disk on first access and cached.
+        """
+        return file_cache.get((self.pred_pdb, "coordinates"), lambda: artifacts.current().read(self.pred_pdb))
+
+    def to_manifest(self) -> dict:
+        """
+        Serializes this Protein's paths and scalars so a later stage can rebuild it without refetching.
+
+        Returns:
+            dict: JSON-serializable manifest.
+        """
+        manifest = {"class": type(self).__name__}
+        for cls in type(self).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if hasattr(self, slot):
+                    manifest[slot] = getattr(self, slot)
+        manifest["organism"] = self.organism.name
+        manifest["file_name"] = str(self.file_name)
+        return manifest
+
+    @classmethod
+    def from_manifest(cls, manifest: dict) -> "Protein":
+        """
+        Rebuilds a Protein from its manifest without touching its files.
+
+        Args:
+            manifest (dict): Manifest from to_manifest.
+
+        Returns:
+            Protein: Rebuilt protein.
+        """
+        protein = cls.__new__(cls)
+        for key, value in manifest.items():
+            if key != "class":
+                setattr(protein, key, value)
+        protein.organism = Organism[manifest["organism"]]
+        protein.file_name = Path(manifest["file_name"])
+        return protein
+
+    def release(self):
+        """
+        Evicts this Protein's cached sequence, annotations and coordinates.
+        """
+        for path in (self.seq, self.annotations_path, self.pred_pdb):
+            if path:
+                file_cache.evict(path)
     
-    def annotate_3d_structure(self) -> str:
+    def annotate_3d_structure(self, crop=None) -> str:
         """
         Annotates 3d structure of this Protein using Pymol and takes snapshot.
+        Low-confidence regions are cropped away first according to crop.
+
+        Args:
+            crop (CropSettings): pLDDT cropping thresholds (defaults to CropSettings()).
 
         Returns:
             str: Path to snapshot of annotated 3d structure.
         """
-        cmd.load(self.pred_pdb)
+        from pymol import cmd
+        from analysis.plddt import CropSettings
+
+        pdb_path = self.cropped_pdb(crop or CropSettings())
 
-        for annotation, idxs in self.annotations.items():
-            for (start, end) in idxs:
-                cmd.color(annotation.color, f"resi {start}-{end}")
-        
-        cmd.orient()
         png_path = self.file_name / f"{self.name}_structure_ss.png"
         pse_path = self.file_name / f"{self.name}_annotated_structure.pse"
-        cmd.png(str(png_path), width=2000, ray=1)
-        cmd.save(str(pse_path))
-        cmd.delete("all")
+
+        with _pymol_lock:
+            cmd.load(pdb_path, self.organism.name)
+
+            for annotation, idxs in self.annotations.items():
+                for (start, end) in idxs:
+                    cmd.color(annotation.color, f"resi {start}-{end}")
+            
+            cmd.orient()
+            cmd.png(str(png_path), width=2000, ray=1)
+            cmd.save(str(pse_path))
+            cmd.delete("all")
         return str(png_path)
     
-    def structure_align(self, mobile_proteins) -> dict:
+    def structure_align(self, mobile_proteins, max_workers=None, executor=None, crop=None, errors=None) -> dict:
         """
         Aligns 3d structure of given protein against this Protein. Prioritizes aligning domains of interest with corresponding annotations. 
-        If none exist, aligns according to this Protein's annotations.
+        If none exist, aligns according to this Protein's annotations. Models are cropped to confident (pLDDT) residues inside
+        those domains before alignment. Mobile proteins are aligned concurrently in a process pool, each worker with its own PyMOL instance.
 
         Args:
             mobile_proteins (list): the mobile proteins to align.
+            max_workers (int): Number of worker processes (defaults to the CPU count).
+            executor (ProcessPoolExecutor): Long-lived pool initialized with init_pymol_worker to use instead of a new one.
+            crop (CropSettings): pLDDT cropping thresholds (defaults to CropSettings()).
+            errors (dict): Filled with the exception of each mobile protein whose alignment failed; without it failures raise.
 
         Returns:
             dict: calculated RMSDs after alignment.
         """
-        pse_path = self.file_name.parent / "alignments.pse"
-        target_path = self.pred_pdb
         target = self.organism.name
-        (target_start, target_end) = (1, self.passport_table_data['length'])
-            
-        if (self.annotations.get(Annotation.ECD) or self.annotations.get(Annotation.CHAIN)):
-            (target_start, target_end) = (self.passport_table_data['length'], 1)
-            for (start, end) in (self.annotations.get(Annotation.ECD) or self.annotations.get(Annotation.CHAIN)):
-                target_start = min(target_start, int(start))
-                target_end = max(target_end, int(end))
+        (target_start, target_end) = self._domain_range(default=(1, self.passport_table_data['length']))
+        from analysis.plddt import CropSettings
 
-        cmd.load(target_path, target)
+        crop = crop or CropSettings()
+        target_pdb = self.cropped_pdb(crop, self._domains() or [(target_start, target_end)])
 
-        cmd.select(f"{target}_sele", f"{target} and resi {target_start}-{target_end}")
-        cmd.create(f"{target}_chain", f"{target}_sele")
-        cmd.delete(f"{target}_sele")
-        cmd.delete(f"{target}")
+        def failed(mobile_protein, error):
+            if errors is None:
+                raise error
+            errors[mobile_protein] = error
 
-        rmsd_dict = {}
+        jobs = {}
+        pool = executor or ProcessPoolExecutor(max_workers=max_workers, initializer=init_pymol_worker)
+        with nullcontext(pool) if executor else pool:
+            for mobile_protein in mobile_proteins:
+                mobile = mobile_protein.organism.name
+                try:
+                    # bad annotations or an unreadable model only cost this ortholog its alignment
+                    (mobile_start, mobile_end) = mobile_protein._domain_range(default=(target_start, target_end))
+                    mobile_pdb = mobile_protein.cropped_pdb(crop, mobile_protein._domains() or [(mobile_start, mobile_end)])
+                except Exception as e:
+                    failed(mobile_protein, e)
+                    continue
+                png_path = mobile_protein.file_name / f"{mobile}_human_aligned_ss.png"
+                pse_path = mobile_protein.file_name / f"{mobile}_human_aligned.pse"
+                jobs[mobile_protein] = (str(png_path), pool.submit(_align_pair, 
+                                                                  (target, target_pdb, target_start, target_end),
+                                                                  (mobile, mobile_pdb, mobile_start, mobile_end),
+                                                                  str(png_path), str(pse_path)))
 
-        for mobile_protein in mobile_proteins:
-            mobile_path = mobile_protein.pred_pdb
-            mobile = mobile_protein.organism.name
-            cmd.load(mobile_path, mobile)
-            
-            (mobile_start, mobile_end) = (target_start, target_end)
-            
-            if (mobile_protein.annotations.get(Annotation.ECD) or mobile_protein.annotations.get(Annotation.CHAIN)):
-                (mobile_start, mobile_end) = (float('-inf'), 0)
-                for (start, end) in (mobile_protein.annotations.get(Annotation.ECD) or mobile_protein.annotations.get(Annotation.CHAIN)):
-                    mobile_start = min(mobile_start, int(start))
-                    mobile_end = max(mobile_end, int(end))
-
-            cmd.select(f"{mobile}_sele", f"{mobile} and resi {mobile_start}-{mobile_end}")
-            cmd.create(f"{mobile}_chain", f"{mobile}_sele")
-            cmd.delete(f"{mobile}_sele")
-            cmd.delete(f"{mobile}")
+        rmsd_dict = {}
+        for mobile_protein, (png_path, future) in jobs.items():
+            try:
+                rmsd = round(future.result(), 2)
+            except Exception as e:
+                failed(mobile_protein, e)
+                continue
+            mobile_protein.set_rmsd(rmsd)
+            rmsd_dict[mobile_protein] = (png_path, rmsd)
         
-            result = cmd.align(f"polymer and name CA and {mobile}_chain", f"polymer and name CA and {target}_chain")
-            mobile_protein.set_rmsd(round(result[0], 2))
+        return rmsd_dict
 
-            png_path = mobile_protein.file_name / f"{mobile}_human_aligned_ss.png"
+    def cropped_pdb(self, crop, domains: list | None = None) -> str:
+        """
+        Gets this Protein's model restricted to confident residues (pLDDT from the B-factor column) inside the given domains.
+        Cropped models are cached next to the full model, keyed by thresholds and domains.
 
-            cmd.disable("all")
-            cmd.enable(mobile)
-            cmd.enable(target)
-            cmd.color("green", target)
-            cmd.zoom()
-            cmd.png(str(png_path), width=3000, ray=1)
-            cmd.save(str(pse_path))
+        Args:
+            crop (CropSettings): pLDDT cropping thresholds.
+            domains (list): (start, end) residue ranges to keep, or None for the whole chain.
 
-            rmsd_dict[mobile_protein] = (str(png_path), round(result[0], 2))
-        
-        return rmsd_dict
+        Returns:
+            str: Readable path to the cropped model, or to the full model if cropping is disabled or would leave nothing.
+        """
+        store = artifacts.current()
+        if not crop.enabled:
+            return store.materialize(self.pred_pdb)
+
+        from analysis import plddt
+
+        domain_key = "_".join(f"{start}-{end}" for start, end in domains) if domains else "all"
+        crop_path = self.file_name / f"{self.pred_pdb_id}_crop_{crop.threshold:g}_{crop.min_length}_{crop.max_gap}_{domain_key}.pdb"
+        if store.exists(crop_path):
+            return store.materialize(crop_path)
+
+        segments = plddt.confident_segments(*plddt.read_plddt(self.pred_pdb_content), crop)
+        segments = plddt.intersect(segments, domains)
+        if segments.size == 0:
+            return store.materialize(self.pred_pdb)
+
+        store.write(crop_path, plddt.crop_pdb(self.pred_pdb_content, segments))
+        return store.materialize(crop_path)
+
+    def _domains(self) -> list:
+        """
+        ECD annotation ranges of this Protein, or CHAIN ranges if there is no ECD.
+
+        Returns:
+            list: (start, end) residue numbers.
+        """
+        domains = self.annotations.get(Annotation.ECD) or self.annotations.get(Annotation.CHAIN) or []
+        return [(int(start), int(end)) for start, end in domains]
+
+    def _domain_range(self, default: tuple) -> tuple:
+        """
+        Residue range spanning this Protein's ECD annotations, or CHAIN annotations if there is no ECD.
+
+        Args:
+            default (tuple): Range used when neither annotation exists.
+
+        Returns:
+            tuple: (start, end) residue numbers.
+        """
+        domains = self.annotations.get(Annotation.ECD) or self.annotations.get(Annotation.CHAIN)
+        if not domains:
+            return default
+        return (min(int(start) for start, _ in domains), max(int(end) for _, end in domains))
 
     def _set_save_seq(self, seq):
         '''
-        Saves sequence to .fasta file and sets seq field to the path of the file.
+        Saves sequence to .fasta file (through the artifact store) and sets seq field to the path of the file.
 
         Args:
             seq (str): Sequence.
         '''
         seq_path = self.file_name / f"{self.organism.name}_{self.id}_seq.fasta"
-        seq_path.write_text(seq)
+        artifacts.current().write(seq_path, seq.encode())
         self.seq = str(seq_path)
 
     def _set_save_annotations(self, annotations):
         '''
-        Saves annotations to .gff file and sets annotations_path and annotations field.
+        Saves annotations to .gff file (through the artifact store), with features renamed to their Annotation, and sets annotations_path field.
 
         Args:
             annotations (str): Annotations.
         '''
         gff_text = annotations.splitlines()
 
-        annotations_dict = defaultdict(list)
         renamed = []
 
         for line in gff_text:
@@ -175,25 +359,27 @@ class Protein(ABC):
             for annotation in Annotation:
                 if feature_type == annotation.feature and (annotation.attr is None or annotation.attr in attributes):
                     parts[2] = annotation.name
-                    annotations_dict[annotation].append((parts[3], parts[4]))
                     renamed.append("\t".join(parts))
                     break
         
         gff_path = self.file_name / f"{self.id}_annotations.gff"
-        gff_path.write_text("\n".join(renamed))
+        artifacts.current().write(gff_path, "\n".join(renamed).encode())
         self.annotations_path = str(gff_path)
-        self.annotations = annotations_dict
 
     def _set_save_af_pdb(self, pdb_name, pdb_content):
         '''
-        Saves PDB content to PDB file and sets pred_pdb_id and pred_pdb field.
+        Saves PDB content to PDB file (through the artifact store) and sets pred_pdb_id and pred_pdb field.
 
         Args:
-            pdb_name (str): PDB file name.
+            pdb_name (str): PDB file name, or None if AlphaFold has no model.
             pdb_content: 3d coordinates of protein.
         '''
+        if not pdb_name:
+            self.pred_pdb_id = None
+            self.pred_pdb = None
+            return
         pdb_path = self.file_name / pdb_name
-        pdb_path.write_bytes(pdb_content)
+        artifacts.current().write(pdb_path, pdb_content)
         self.pred_pdb_id = pdb_name[:-4]
         self.pred_pdb = str(pdb_path)
 
@@ -0,0 +1,102 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from models.organism import Organism
+from models.protein_model.human_protein import HumanProtein
+from models.protein_model.ortholog import Ortholog
+from storage import workspace
+
+@dataclass
+class RunState:
+    """
+    Represents the hand-off state of one protein passport between pipeline stages,
+    persisted as JSON next to the passport outputs.
+
+    Attributes:
+        protein_name (str): Name of the target protein.
+        proteins (dict): Proteins of this run keyed by Organism.
+        structure_img (str): Path to the annotated human structure image.
+        sequence_img (str): Path to the annotated human sequence image.
+        alignments (dict): Alignment image path and RMSD keyed by ortholog Organism name.
+        msa (str): Path to the aligned FASTA of the human protein and its orthologs.
+        string_img (str): Path to the STRING network image.
+        string_partners (str): Path to the STRING partner table (TSV).
+        errors (list): Failures the passport was built without, as dicts with stage, organism and error.
+    """
+    protein_name: str
+    proteins: dict = field(default_factory=dict)
+    structure_img: str | None = None
+    sequence_img: str | None = None
+    alignments: dict = field(default_factory=dict)
+    msa: str | None = None
+    string_img: str | None = None
+    string_partners: str | None = None
+    errors: list = field(default_factory=list)
+
+    @property
+    def human(self) -> HumanProtein | None:
+        return self.proteins.get(Organism.HUMAN)
+
+    @property
+    def orthologs(self) -> list:
+        return [protein for organism, protein in self.proteins.items() if organism != Organism.HUMAN]
+
+    @staticmethod
+    def path_for(protein_name: str) -> Path:
+        """
+        Gets the state file path of a protein.
+
+        Args:
+            protein_name (str): Name of the target protein.
+
+        Returns:
+            Path: State file path.
+        """
+        return workspace.current().target_dir(protein_name) / "passport_state.json"
+
+    def save(self):
+        """
+        Writes this RunState to its state file.
+        """
+        data = {
+            "protein_name": self.protein_name,
+            "proteins": [protein.to_manifest() for protein in self.proteins.values()],
+            "structure_img": self.structure_img,
+            "sequence_img": self.sequence_img,
+            "alignments": self.alignments,
+            "msa": self.msa,
+            "string_img": self.string_img,
+            "string_partners": self.string_partners,
+            "errors": self.errors
+        }
+        path = self.path_for(self.protein_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2))
+
+    @classmethod
+    def load(cls, protein_name: str) -> "RunState":
+        """
+        Reads the RunState of a protein written by an earlier stage.
+
+        Args:
+            protein_name (str): Name of the target protein.
+
+        Returns:
+            RunState: Loaded state.
+        """
+        data = json.loads(cls.path_for(protein_name).read_text())
+        classes = {c.__name__: c for c in (HumanProtein, Ortholog)}
+        proteins = {}
+        for manifest in data["proteins"]:
+            protein = classes[manifest["class"]].from_manifest(manifest)
+            proteins[protein.organism] = protein
+
+        return cls(protein_name=data["protein_name"],
+                   proteins=proteins,
+                   structure_img=data.get("structure_img"),
+                   sequence_img=data.get("sequence_img"),
+                   alignments=data.get("alignments", {}),
+                   msa=data.get("msa"),
+                   string_img=data.get("string_img"),
+                   string_partners=data.get("string_partners"),
+                   errors=data.get("errors", []))
@@ -0,0 +1,492 @@
+import csv, json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from client.uniprot_client import UniProtClient
+from client.proteins_client import ProteinsClient
+from client.alphafold_client import AlphaFoldClient
+from client.string_client import StringClient
+from models.protein_model.human_protein import HumanProtein
+from models.protein_model.ortholog import Ortholog
+from models.protein_model.protein import Protein
+from models.organism import Organism
+from models.run_state import RunState
+from storage import catalog, workspace
+from analysis.similarity import alignment_identity, rank_candidates
+
+MIN_ORTHOLOG_IDENTITY = 0.5
+PANEL_WORKERS = 16
+TEMPLATE_PATH = Path(__file__).parent.parent / "assets" / "template.pptx"
+
+class Cancelled(Exception):
+    """
+    Raised between stages when a run has been cancelled.
+    """
+
+def print_progress(event_type: str, **data):
+    """
+    Default event handler of the stages: prints progress messages and ignores every other event.
+
+    Args:
+        event_type (str): Event type.
+    """
+    if event_type == "message":
+        print(data["message"])
+    elif event_type == "warning":
+        print(f"Warning: {data['organism'] or 'panel'} {data['stage']} failed, continuing without it ({data['error']})")
+
+def _record_error(errors: list, emit, stage: str, organism, error):
+    """
+    Records a failure the passport is built without and reports it as a warning event.
+
+    Args:
+        errors (list): Failures of the target so far.
+        emit (callable): Event handler.
+        stage (str): Stage that failed.
+        organism (Organism): Organism affected, or None for the whole panel.
+        error (Exception | str): Failure.
+    """
+    if isinstance(error, Exception):
+        error = f"{type(error).__name__}: {error}"
+    organism = organism.name if organism is not None else None
+    errors.append({"stage": stage, "organism": organism, "error": error})
+    emit("warning", stage=stage, organism=organism, error=error)
+
+def _clear_errors(errors: list, stage: str):
+    """
+    Drops the failures an earlier run of a stage recorded, before the stage is run again.
+
+    Args:
+        errors (list): Failures of the target so far.
+        stage (str): Stage about to run.
+    """
+    errors[:] = [error for error in errors if error["stage"] != stage]
+
+def _uniprot_query(protein_name, protein_id, interactive=False, min_identity=MIN_ORTHOLOG_IDENTITY, max_workers=PANEL_WORKERS, emit=print_progress, 
+                   errors=None) -> dict:
+    uniprot_data = {o: None for o in Organism}
+    errors = [] if errors is None else errors
+
+    uniprot_client = UniProtClient()
+    human_data =  uniprot_client.fetch(protein_id, kb=True)
+    if not human_data.get('primaryAccession'):
+        raise LookupError(f"UniProtKB has no entry {protein_id}")
+    uniprot_data[Organism.HUMAN] = human_data
+    
+    protein_name = human_data['genes'][0]['geneName']['value']
+    rec_name=human_data['proteinDescription']['recommendedName']['fullName']['value']
+
+    orthologs = [o for o in Organism if o != Organism.HUMAN]
+    from analysis import minimizer_index
+    indexed = {o for o in orthologs if minimizer_index.load(o) is not None}
+    # UniRef members are only needed for organisms without a proteome index
+    uniref_data = uniprot_client.fetch(protein_id, ref=True) if len(indexed) < len(orthologs) else {}
+    by_taxon = {o.taxon_id: o for o in orthologs}
+
+    # first UniRef member per panel organism whose name matches the human recommended name
+    matches = {}
+    for result in uniref_data.get('results') or []:
+        match = by_taxon.get(result['organismTaxId'])
+        if match and match not in matches and result['proteinName'] == rec_name:
+            matches[match] = result['accessions']
+            if len(matches) == len(orthologs): break
+
+    def resolve_match(organism):
+        accessions = matches[organism]
+        uniref_r = uniprot_client.fetch(protein_id=accessions[0], kb=True)
+        search_r = uniprot_client.fetch(protein_id=rec_name, gene=protein_name, organism=organism.taxon_id, kb=True, search=True)
+        if search_r.get('results') and uniref_r['primaryAccession'] == search_r['results'][0]['primaryAccession']:
+            return uniref_r
+        if interactive:
+            chosen_ortholog = _choose_ortholog_selection(organism_str=organism.name, uniref_accessions=accessions, search=search_r.get('results', []))
+        else:
+            chosen_ortholog = _auto_ortholog_selection(organism_str=organism.name, uniref_accessions=accessions, search=search_r.get('results', []), 
+                                                       human_seq=human_data['sequence']['value'], min_identity=min_identity, emit=emit)
+        return uniprot_client.fetch(chosen_ortholog, kb=True) if chosen_ortholog else None
+
+    def search_organism(organism):
+        r = uniprot_client.fetch(protein_id=rec_name, gene=protein_name, organism=organism.taxon_id, kb=True, search=True)
+        return r['results'][0] if r.get('results') else None
+
+    def name_lookup(organism):
+        return resolve_match(organism) if organism in matches else search_organism(organism)
+
+    def resolve_indexed(organism):
+        ranked = minimizer_index.load(organism).rank(human_data['sequence']['value'])
+        if not ranked or ranked[0][1] < min_identity:
+            # proteome index without a close enough hit, e.g. a fragment-only proteome: fall back to names
+            return name_lookup(organism)
+        accession, identity, score = ranked[0]
+        emit("message", message=f"Selected {organism.name} ortholog {accession} from the proteome index "
+                                 f"({identity:.1%} identity, minimizer score {score:.2f})")
+        return uniprot_client.fetch(accession, kb=True) or None
+
+    # prompts must not interleave, so interactive runs resolve one organism at a time
+    with ThreadPoolExecutor(max_workers=1 if interactive else max_workers) as executor:
+        futures = {o: executor.submit(resolve_indexed if o in indexed else name_lookup, o) for o in orthologs}
+        for organism, future in futures.items():
+            try:
+                uniprot_data[organism] = future.result()
+            except Exception as e:
+                _record_error(errors, emit, "fetch", organism, e)
+    
+    return uniprot_data
+
+def _get_fasta_content(protein_id) -> str:
+    uniprot_client = UniProtClient()
+    return uniprot_client.fetch(protein_id=protein_id, fasta=True)
+    
+def _get_annotations_texts(protein_ids) -> dict:
+    annotations_client = ProteinsClient()
+    return annotations_client.fetch_many(protein_ids)
+
+def _get_af_pdb(protein_id) -> dict:
+    af_client = AlphaFoldClient()
+    return af_client.fetch(protein_id=protein_id)
+
+def _get_string_db_interactions(protein_name, string_id, interactions=None) -> tuple:
+    from render.network_image import render_network
+
+    if not string_id:
+        return (None, None)
+    interactions = interactions or StringClient().fetch(protein_id=string_id)
+
+    output_dir = workspace.current().target_dir(protein_name)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    partners_path = output_dir / "string_partners.tsv"
+    with open(partners_path, "w", newline="") as fh:
+        writer = csv.writer(fh, delimiter="\t")
+        writer.writerow(["partner", "string_id", "score"])
+        for row in interactions["partners"]:
+            writer.writerow([row["preferredName_B"], row["stringId_B"], row["score"]])
+
+    img_path = render_network(string_id, interactions, str(output_dir / "string_network.png"))
+    return (img_path, str(partners_path))
+
+def prefetch_string_interactions(states: list) -> dict:
+    string_ids = [state.human.string_id[0] for state in states if state.human and state.human.string_id]
+    return StringClient().fetch_many(string_ids) if string_ids else {}
+
+def _create_proteins(uniprot_data, protein_name, max_workers=PANEL_WORKERS, emit=print_progress, errors=None) -> dict[Organism, Protein]:
+    errors = [] if errors is None else errors
+
+    # annotations for the whole panel come back in a single Proteins API request
+    try:
+        annotations = _get_annotations_texts([results['primaryAccession'] for results in uniprot_data.values() if results is not None])
+    except Exception as e:
+        _record_error(errors, emit, "fetch", None, e)
+        annotations = {}
+
+    def create(organism, results):
+        accession = results['primaryAccession']
+        fasta = _get_fasta_content(accession)
+        annotations_text = annotations.get(accession, "")
+        af_pdb = _get_af_pdb(accession)
+
+        if not af_pdb:
+            # kept without a structure, the deck then leaves out what needs one
+            _record_error(errors, emit, "fetch", organism, f"AlphaFold has no model for {accession}")
+        if organism == Organism.HUMAN:
+            return HumanProtein.from_uniprot_result(protein_name=protein_name, uniprot_results=results, af_results=af_pdb, annotations_text=annotations_text, fasta=fasta)
+        return Ortholog.from_uniprot_result(protein_name=protein_name, uniprot_results=results, af_results=af_pdb, annotations_text=annotations_text, organism=organism, fasta=fasta)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {organism: executor.submit(create, organism, results) for organism, results in uniprot_data.items() if results is not None}
+        proteins = {}
+        for organism, future in futures.items():
+            try:
+                proteins[organism] = future.result()
+            except Exception as e:
+                if organism == Organism.HUMAN:
+                    raise
+                _record_error(errors, emit, "fetch", organism, e)
+
+    return proteins
+
+def _auto_ortholog_selection(organism_str, uniref_accessions, search, human_seq, min_identity=MIN_ORTHOLOG_IDENTITY, emit=print_progress):
+    uniprot_client = UniProtClient()
+    candidates = {entry['primaryAccession']: entry.get('sequence', {}).get('value') for entry in search}
+    for uniref_accession in uniref_accessions:
+        if uniref_accession not in candidates:
+            candidates[uniref_accession] = uniprot_client.fetch(uniref_accession, kb=True).get('sequence', {}).get('value')
+
+    ranked = rank_candidates(human_seq, candidates)
+    if not ranked or ranked[0][1] < min_identity:
+        best = f"{ranked[0][0]} ({ranked[0][1]:.1%} identity)" if ranked else "none"
+        emit("message", message=f"No {organism_str} ortholog above {min_identity:.0%} identity (best: {best}), skipping")
+        return None
+
+    accession, identity, kmer_score = ranked[0]
+    emit("message", message=f"Selected {organism_str} ortholog {accession} ({identity:.1%} identity, k-mer score {kmer_score:.2f}) "
+                             f"from {len(candidates)} candidates")
+    return accession
+
+def _choose_ortholog_selection(organism_str, uniref_accessions, search):
+    prompt = f"Found multiple {organism_str} orthologs. Please select the desired ortholog from the following:\n"
+    for uniref_accession in uniref_accessions:
+        prompt += f"{uniref_accession}\n"
+    for entry in search:
+        prompt += f"{entry['primaryAccession']}\n"
+    return input(prompt+"Chosen ortholog: ").strip().lower()
+
+def _confirm_ortholog_selection(orthologs):
+    while True:
+        prompt = f"Using the following orthologs to create Protein Passport:\n"
+    
+        for organism, data in orthologs.items():
+            prompt += f"{organism.name}: {data['primaryAccession']}\n"
+    
+        prompt += "Press \'y\' if you would like to continue with these orthologs. If incorrect orthologs are present, press \'c\' to enter orthologs manually: "
+    
+        response = input(prompt).strip().lower()
+    
+        if response == 'y':
+            return orthologs
+        elif response == 'c':
+            orthologs = _custom_orthologs()
+        
+def _custom_orthologs():
+    uniprot_data = {o: None for o in Organism}
+    for organism in Organism:
+        protein_id = input(f"Please enter desired {organism.name} UniProt Accession (enter nothing for no ortholog): ").strip()
+        uniprot_client = UniProtClient()
+        data =  uniprot_client.fetch(protein_id, kb=True)
+        if data:
+            uniprot_data[organism] = data
+    return uniprot_data
+        
+
+        
+
+@contextmanager
+def _stage(name, emit, timings, cancel):
+    if cancel is not None and cancel.is_set():
+        raise Cancelled(f"Cancelled before {name}")
+    emit("stage_started", stage=name)
+    start = perf_counter()
+    try:
+        yield
+    except Exception as e:
+        emit("stage_failed", stage=name, error=f"{type(e).__name__}: {e}")
+        raise
+    timings[name] = round(perf_counter() - start, 2)
+    emit("stage_finished", stage=name, seconds=timings[name])
+
+def fetch(protein_id, protein_name, interactive=False, min_identity=MIN_ORTHOLOG_IDENTITY, emit=print_progress) -> RunState:
+    emit("message", message=f"Retrieving information for {protein_name}...")
+    errors = []
+    # the UniProt JSON is only needed to build the proteins, so it is not kept for the rest of the run
+    proteins = _create_proteins(uniprot_data=_uniprot_query(protein_name=protein_name, protein_id=protein_id, interactive=interactive, min_identity=min_identity, 
+                                                            emit=emit, errors=errors), 
+                                protein_name=protein_name, emit=emit, errors=errors)
+    state = RunState(protein_name=protein_name, proteins=proteins, errors=errors)
+    state.save()
+    emit("artifact", kind="state", path=str(state.path_for(protein_name)))
+    return state
+
+def prealign_sequences(states: list, max_workers=None) -> dict:
+    """
+    Aligns the panels of many targets at once, one target per process.
+
+    Args:
+        states (list): RunStates of the targets.
+        max_workers (int): Processes (default: CPU count).
+
+    Returns:
+        dict: Alignment keyed by protein name, without targets that could not be aligned.
+    """
+    from analysis import msa
+    from models.protein_model.human_protein import msa_panel
+
+    panels = {}
+    for state in states:
+        try:
+            panels[state.protein_name] = msa_panel([state.human, *state.orthologs])
+        except Exception as e:
+            # unreadable sequences fail again, and are recorded, in the target's own align stage
+            print_progress("message", message=f"{state.protein_name}: not prealigned ({type(e).__name__}: {e})")
+    alignments = msa.align_batch(list(panels.values()), max_workers=max_workers)
+    return {name: alignment for name, alignment in zip(panels, alignments) if alignment is not None}
+
+def align(state: RunState, executor=None, crop=None, emit=print_progress, msa="native", alignment=None) -> RunState:
+    human = state.human
+    orthologs = state.orthologs
+
+    _clear_errors(state.errors, "align")
+    emit("message", message="Annotating and aligning sequences...")
+    identities = {}
+    try:
+        if msa == "geneious":
+            # the identities on the deck must not come from the alignment of an earlier native run
+            state.msa = None
+            human.annotate_align_seq_geneious(orthologs)
+        else:
+            from analysis.msa import Alignment
+            state.msa = human.annotate_align_seq(orthologs, executor=executor, alignment=alignment)
+            # identities to the human sequence come with the alignment, no separate pairwise alignment needed
+            aligned = alignment or Alignment.read(state.msa)
+            identities = {o.organism: aligned.identity(0, i) for i, o in enumerate(orthologs, start=1)}
+            emit("artifact", kind="msa", path=state.msa)
+    except Exception as e:
+        _record_error(state.errors, emit, "align", Organism.HUMAN, e)
+
+    emit("message", message="Performing structural alignment...")
+    rmsd_map = {}
+    if human.pred_pdb:
+        failures = {}
+        try:
+            rmsd_map = human.structure_align([o for o in orthologs if o.pred_pdb], executor=executor, crop=crop, errors=failures)
+        except Exception as e:
+            _record_error(state.errors, emit, "align", Organism.HUMAN, e)
+        for ortholog, error in failures.items():
+            _record_error(state.errors, emit, "align", ortholog.organism, error)
+    state.alignments = {ortholog.organism.name: (img_path, rmsd) for ortholog, (img_path, rmsd) in rmsd_map.items()}
+    for ortholog in orthologs:
+        identity = identities.get(ortholog.organism)
+        try:
+            if identity is None:
+                identity = alignment_identity(human.sequence, ortholog.sequence)
+        except Exception as e:
+            _record_error(state.errors, emit, "align", ortholog.organism, e)
+            continue
+        ortholog.set_similarity(round(identity * 100, 1))
+    for organism, (img_path, rmsd) in state.alignments.items():
+        emit("artifact", kind="structure_alignment", path=img_path, organism=organism, rmsd=rmsd)
+    state.save()
+    return state
+
+def render(state: RunState, string_interactions=None, crop=None, emit=print_progress) -> RunState:
+    from render.sequence_image import render_sequence
+
+    human = state.human
+    string_id = human.string_id[0] if human.string_id else None
+
+    _clear_errors(state.errors, "render")
+    emit("message", message="Rendering sequence, structure and interaction network...")
+    try:
+        state.sequence_img = render_sequence(human.sequence, human.annotations, str(human.file_name / f"{human.name}_annotated_sequence.png"))
+    except Exception as e:
+        _record_error(state.errors, emit, "render", Organism.HUMAN, e)
+    if human.pred_pdb:
+        try:
+            state.structure_img = human.annotate_3d_structure(crop=crop)
+        except Exception as e:
+            _record_error(state.errors, emit, "render", Organism.HUMAN, e)
+    try:
+        state.string_img, state.string_partners = _get_string_db_interactions(state.protein_name, string_id, 
+                                                                              (string_interactions or {}).get(string_id))
+    except Exception as e:
+        _record_error(state.errors, emit, "render", None, e)
+    for kind in ("sequence_img", "structure_img", "string_img", "string_partners"):
+        if getattr(state, kind):
+            emit("artifact", kind=kind, path=getattr(state, kind))
+    state.save()
+    return state
+
+def _catalog_rows(state: RunState, output_path) -> list:
+    human = state.human
+    rows = [{"organism": Organism.HUMAN.name, "accession": human.id, "length": human.passport_table_data["length"],
+             "mass": human.passport_table_data["mass"], "pdb_ids": ",".join(human.passport_table_data["exp_pdbs"] or [])}]
+    for ortholog in state.orthologs:
+        rows.append({"organism": ortholog.organism.name, "accession": ortholog.id, "length": len(ortholog.sequence),
+                     "identity": ortholog.similarity, "rmsd": ortholog.rmsd})
+
+    for row, protein in zip(rows, [human, *state.orthologs]):
+        row.update(run_id=workspace.current().run_id or "", protein_name=state.protein_name, human_accession=human.id,
+                   alphafold_id=protein.pred_pdb_id, deck_path=str(output_path))
+    return rows
+
+def deck(state: RunState, user_name, emit=print_progress) -> Path:
+    from models.entry import Entry
+    from models.image import Img
+
+    human = state.human
+    orthologs = state.orthologs
+
+    slide_1_img = Img(state.structure_img, caption=human.pred_pdb_id) if state.structure_img else None
+
+    slide_3_imgs = []
+    for ortholog in orthologs:
+        if ortholog.organism.name in state.alignments:
+            img_path, rmsd = state.alignments[ortholog.organism.name]
+            slide_3_imgs.append(Img(img_path, caption="Human:" + ortholog.organism.name.capitalize() + "\nRMSD: " + str(rmsd) + "Å"))
+
+    _clear_errors(state.errors, "deck")
+    alignment = None
+    if state.msa:
+        from analysis.msa import Alignment
+        try:
+            alignment = Alignment.read(state.msa)
+        except Exception as e:
+            # the deck leaves the identity cells to fill in by hand
+            _record_error(state.errors, emit, "deck", Organism.HUMAN, e)
+
+    emit("message", message="Creating powerpoint...")
+    entry = Entry(template_path=TEMPLATE_PATH, human=human, orthologs=orthologs, user_name=user_name, alignment=alignment)
+    entry.populate_info_table_slide(slide_1_img)
+    entry.populate_hu_seq_slide(Img(state.sequence_img) if state.sequence_img else None)
+    entry.populate_str_align_slide(slide_3_imgs)
+    entry.populate_string_db_slide(state.string_img, state.string_partners)
+    # degraded passports leave out the slides they have nothing for
+    entry.remove_slides([index for index, empty in ((1, not state.sequence_img), (2, not slide_3_imgs), (3, not state.string_img)) if empty])
+    emit("artifact", kind="deck", path=str(entry.output_path))
+
+    report = entry.output_path.parent / "failure_report.json"
+    if state.errors:
+        report.write_text(json.dumps(state.errors, indent=2))
+        emit("artifact", kind="failure_report", path=str(report))
+    else:
+        # a clean rebuild must not leave the report of an earlier one next to the deck
+        report.unlink(missing_ok=True)
+
+    # buffered, callers write the rows with catalog.flush_all
+    catalog.current().add(_catalog_rows(state, entry.output_path))
+    return entry.output_path
+
+def run(protein_id, protein_name, user_name, interactive=False, min_identity=MIN_ORTHOLOG_IDENTITY, executor=None, timings=None, crop=None, 
+        emit=print_progress, cancel=None, errors=None, msa="native") -> Path:
+    """
+    Runs every stage for one target. Failures of single orthologs, models or services are recorded and the
+    passport is built without them; only a target without a human UniProt entry, or a failing deck, raises.
+
+    Args:
+        protein_id (str): UniProt accession of the human protein.
+        protein_name (str): Protein name, used for output paths.
+        user_name (str): Author shown in the deck.
+        interactive (bool): Prompt for ambiguous orthologs instead of choosing automatically.
+        min_identity (float): Minimum identity for automatic ortholog selection.
+        executor (Executor): Process pool for structural alignment and the pairwise sequence alignments.
+        timings (dict): Filled with seconds per stage.
+        crop (CropSettings): pLDDT cropping, None for the defaults (CropSettings()); CropSettings(threshold=0) leaves models uncropped.
+        emit (callable): Called as emit(event_type, **data) for messages, stage boundaries and artifacts.
+        cancel (Event): Checked before each stage, raising Cancelled once set.
+        errors (list): Filled with the failures the passport was built without.
+        msa (str): Sequence aligner, "native" (built in) or "geneious" (Geneious MUSCLE).
+
+    Returns:
+        Path: Deck path.
+    """
+    timings = {} if timings is None else timings
+
+    with _stage("fetch", emit, timings, cancel):
+        state = fetch(protein_id, protein_name, interactive=interactive, min_identity=min_identity, emit=emit)
+
+    try:
+        with _stage("align", emit, timings, cancel):
+            align(state, executor=executor, crop=crop, emit=emit, msa=msa)
+
+        with _stage("render", emit, timings, cancel):
+            render(state, crop=crop, emit=emit)
+
+        with _stage("deck", emit, timings, cancel):
+            output_path = deck(state, user_name, emit=emit)
+    finally:
+        for protein in state.proteins.values():
+            protein.release()
+
+    if errors is not None:
+        errors.extend(state.errors)
+    emit("message", message="Completed" if not state.errors else f"Completed with {len(state.errors)} failed parts left out (see failure_report.json)")
+    return output_path
@@ -0,0 +1,107 @@
+import math, random
+from PIL import Image, ImageDraw, ImageFont
+
+# sized for the free area of the STRING slide (about 7.5 x 5.3 in at 200 dpi)
+NETWORK_IMG_SIZE = (1500, 1060)
+NODE_COLORS = ["#8dd3c7", "#bebada", "#fb8072", "#80b1d3", "#fdb462", "#b3de69", "#fccde5", "#bc80bd", "#ccebc5", "#ffed6f"]
+QUERY_COLOR = "#e41a1c"
+
+def layout(nodes: list, edges: list, center: str, iterations: int = 200, seed: int = 0) -> dict:
+    """
+    Fruchterman-Reingold force-directed layout with the query node pinned at the center.
+
+    Args:
+        nodes (list): Node IDs.
+        edges (list): (node, node, weight) tuples.
+        center (str): Node pinned at the center.
+        iterations (int): Layout iterations.
+        seed (int): Seed of the initial positions, so layouts are reproducible.
+
+    Returns:
+        dict: (x, y) in [-1, 1] keyed by node.
+    """
+    rng = random.Random(seed)
+    pos = {n: (0.0, 0.0) if n == center else (math.cos(2 * math.pi * i / len(nodes)), math.sin(2 * math.pi * i / len(nodes)))
+           for i, n in enumerate(nodes)}
+    pos = {n: (x + rng.uniform(-0.05, 0.05), y + rng.uniform(-0.05, 0.05)) if n != center else (x, y) for n, (x, y) in pos.items()}
+
+    k = math.sqrt(4.0 / max(len(nodes), 1))
+    temperature = 0.2
+    for _ in range(iterations):
+        disp = {n: [0.0, 0.0] for n in nodes}
+        for i, a in enumerate(nodes):
+            for b in nodes[i + 1:]:
+                dx, dy = pos[a][0] - pos[b][0], pos[a][1] - pos[b][1]
+                dist = max(math.hypot(dx, dy), 1e-3)
+                force = k * k / dist
+                disp[a][0] += dx / dist * force; disp[a][1] += dy / dist * force
+                disp[b][0] -= dx / dist * force; disp[b][1] -= dy / dist * force
+        for a, b, weight in edges:
+            dx, dy = pos[a][0] - pos[b][0], pos[a][1] - pos[b][1]
+            dist = max(math.hypot(dx, dy), 1e-3)
+            force = dist * dist / k * weight
+            disp[a][0] -= dx / dist * force; disp[a][1] -= dy / dist * force
+            disp[b][0] += dx / dist * force; disp[b][1] += dy / dist * force
+        for n in nodes:
+            if n == center:
+                continue
+            dx, dy = disp[n]
+            length = max(math.hypot(dx, dy), 1e-9)
+            step = min(length, temperature)
+            x, y = pos[n][0] + dx / length * step, pos[n][1] + dy / length * step
+            pos[n] = (max(-1.0, min(1.0, x)), max(-1.0, min(1.0, y)))
+        temperature = max(temperature * 0.98, 0.005)
+
+    return pos
+
+def render_network(query_id: str, interactions: dict, path: str, size: tuple = NETWORK_IMG_SIZE) -> str:
+    """
+    Draws a STRING interaction network: query node in the center, partners around it,
+    edge width by combined score.
+
+    Args:
+        query_id (str): STRING ID of the query protein.
+        interactions (dict): 'partners' and 'edges' rows from StringClient.
+        path (str): Output PNG path.
+        size (tuple): Image (width, height) in pixels.
+
+    Returns:
+        str: Output PNG path.
+    """
+    names = {query_id: query_id.split(".", 1)[-1]}
+    for row in interactions["partners"]:
+        names[row["stringId_A"]] = row["preferredName_A"]
+        names[row["stringId_B"]] = row["preferredName_B"]
+    nodes = list(names)
+
+    edges = [(row["stringId_A"], row["stringId_B"], float(row["score"])) for row in interactions["edges"]
+             if row["stringId_A"] in names and row["stringId_B"] in names and row["stringId_A"] != row["stringId_B"]]
+    if not edges:
+        edges = [(row["stringId_A"], row["stringId_B"], float(row["score"])) for row in interactions["partners"]]
+
+    pos = layout(nodes, edges, center=query_id)
+
+    width, height = size
+    margin = 90
+    radius = max(18, min(width, height) // 28)
+    to_px = lambda n: (margin + (pos[n][0] + 1) / 2 * (width - 2 * margin), margin + (pos[n][1] + 1) / 2 * (height - 2 * margin))
+
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.load_default(size=radius)
+    except TypeError:
+        # Pillow < 10.1 has a single bitmap default font
+        font = ImageFont.load_default()
+
+    for a, b, weight in edges:
+        draw.line([to_px(a), to_px(b)], fill="#555555", width=max(1, round(weight * 8)))
+
+    for i, n in enumerate(nodes):
+        x, y = to_px(n)
+        color = QUERY_COLOR if n == query_id else NODE_COLORS[i % len(NODE_COLORS)]
+        draw.ellipse([x - radius, y - radius, x + radius, y + radius], fill=color, outline="black", width=2)
+        draw.text((x, y + radius + 4), names[n], fill="black", font=font, anchor="ma")
+
+    img.save(path)
+    return path
@@ -0,0 +1,145 @@
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+from models.annotation import Annotation
+
+# aspect of the picture placeholder on the human sequence slide (11242040 x 4873625 EMU) at 200 dpi
+SEQUENCE_IMG_SIZE = (2459, 1066)
+BLOCK = 10
+# painted in this order, so the more specific features win where spans overlap
+PAINT_ORDER = [Annotation.CHAIN, Annotation.ECD, Annotation.CYTO, Annotation.TM, Annotation.SIGNAL]
+LABELS = {Annotation.CHAIN: "Chain", Annotation.ECD: "Extracellular", Annotation.CYTO: "Cytoplasmic",
+          Annotation.TM: "Transmembrane", Annotation.SIGNAL: "Signal peptide"}
+
+def residue_colors(length: int, annotations: dict) -> np.ndarray:
+    """
+    Assigns every residue the index (into PAINT_ORDER, -1 for none) of the annotation covering it.
+    Each annotation's spans are turned into a coverage mask with one cumulative sum over +1/-1 boundary marks.
+
+    Args:
+        length (int): Sequence length.
+        annotations (dict): (start, end) residue ranges (1-based, inclusive) keyed by Annotation.
+
+    Returns:
+        np.ndarray: Annotation index per residue.
+    """
+    colors = np.full(length, -1, dtype=np.int8)
+    for index, annotation in enumerate(PAINT_ORDER):
+        spans = np.asarray(annotations.get(annotation) or [], dtype=np.int64).reshape(-1, 2)
+        if spans.size == 0:
+            continue
+        starts = np.clip(spans[:, 0] - 1, 0, length)
+        ends = np.clip(spans[:, 1], 0, length)
+        marks = np.zeros(length + 1, dtype=np.int32)
+        np.add.at(marks, starts, 1)
+        np.add.at(marks, ends, -1)
+        colors[np.cumsum(marks[:-1]) > 0] = index
+    return colors
+
+def _font(size: int):
+    """
+    Gets a monospace font of the given pixel size, or Pillow's default font if none is installed.
+
+    Returns:
+        tuple: (font, whether it is monospace).
+    """
+    for name in ("DejaVuSansMono.ttf", "LiberationMono-Regular.ttf", "Menlo.ttc", "consola.ttf"):
+        try:
+            return (ImageFont.truetype(name, size), True)
+        except OSError:
+            continue
+    try:
+        return (ImageFont.load_default(size=size), False)
+    except TypeError:
+        # Pillow < 10.1 has a single bitmap default font
+        return (ImageFont.load_default(), False)
+
+def _tint(color: str, amount: float = 0.55) -> tuple:
+    r, g, b = ImageColor.getrgb(color)
+    return tuple(round(c + (255 - c) * amount) for c in (r, g, b))
+
+def _fit(length: int, size: tuple, legend_height: int) -> tuple:
+    """
+    Finds the largest font size at which the wrapped sequence fits the image.
+
+    Returns:
+        tuple: (font size, blocks of BLOCK residues per line).
+    """
+    width, height = size
+    for font_size in range(40, 5, -1):
+        cell_w, line_h = font_size * 0.62, font_size * 1.45
+        blocks = int((width - 8 * cell_w) // ((BLOCK + 1) * cell_w))
+        if blocks < 1:
+            continue
+        lines = -(-length // (blocks * BLOCK))
+        if lines * line_h <= height - legend_height:
+            return (font_size, blocks)
+    return (6, max(1, int((width - 48) // ((BLOCK + 1) * 4))))
+
+def render_sequence(sequence: str, annotations: dict, path: str, size: tuple = SEQUENCE_IMG_SIZE) -> str:
+    """
+    Draws the sequence wrapped in blocks of ten residues with residue numbers at the start of each line,
+    the background of every residue tinted with the color of its annotation, and a legend.
+
+    Args:
+        sequence (str): Amino acid sequence.
+        annotations (dict): (start, end) residue ranges keyed by Annotation.
+        path (str): Output PNG path.
+        size (tuple): Image (width, height) in pixels.
+
+    Returns:
+        str: Output PNG path.
+    """
+    width, height = size
+    legend_height = height // 14
+    font_size, blocks = _fit(len(sequence), size, legend_height)
+    font, monospace = _font(font_size)
+    line_h = font_size * 1.45
+    # the font's own advance keeps block strings and their highlights aligned
+    cell_w = font.getlength("M") if monospace else font_size * 0.62
+    per_line = blocks * BLOCK
+    number_w = 8 * cell_w
+
+    colors = residue_colors(len(sequence), annotations)
+    fills = [_tint(annotation.color) for annotation in PAINT_ORDER]
+
+    # x of every residue column: blocks are separated by one blank cell
+    columns = np.arange(per_line)
+    column_x = number_w + (columns + columns // BLOCK) * cell_w
+
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+
+    for line, start in enumerate(range(0, len(sequence), per_line)):
+        y = line * line_h
+        line_colors = colors[start:start + per_line]
+
+        # one rectangle per run of equal color, split at block gaps
+        breaks = np.flatnonzero((np.diff(line_colors) != 0) | (np.diff(columns[:line_colors.size] // BLOCK) != 0)) + 1
+        run_starts = np.concatenate(([0], breaks))
+        run_ends = np.concatenate((breaks, [line_colors.size]))
+        for run_start, run_end in zip(run_starts, run_ends):
+            if line_colors[run_start] >= 0:
+                draw.rectangle([column_x[run_start], y, column_x[run_end - 1] + cell_w, y + font_size * 1.2],
+                               fill=fills[line_colors[run_start]])
+
+        draw.text((number_w - cell_w, y), str(start + 1), fill="#666666", font=font, anchor="ra")
+        chunk = sequence[start:start + per_line]
+        if monospace:
+            for block in range(0, len(chunk), BLOCK):
+                draw.text((column_x[block], y), chunk[block:block + BLOCK], fill="black", font=font)
+        else:
+            for i, residue in enumerate(chunk):
+                draw.text((column_x[i] + cell_w / 2, y), residue, fill="black", font=font, anchor="ma")
+
+    legend_font, _ = _font(max(12, legend_height // 2))
+    x, y = number_w, height - legend_height + legend_height // 4
+    for index, annotation in enumerate(PAINT_ORDER):
+        if not (colors == index).any():
+            continue
+        swatch = legend_height // 2
+        draw.rectangle([x, y, x + swatch, y + swatch], fill=fills[index], outline="black")
+        draw.text((x + swatch * 1.4, y), LABELS[annotation], fill="black", font=legend_font)
+        x += swatch * 1.4 + draw.textlength(LABELS[annotation], font=legend_font) + swatch * 2
+
+    img.save(path)
+    return path
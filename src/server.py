@@ -0,0 +1,212 @@
+import json, os, uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from threading import Lock
+from time import time
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """
+    HTTP server listening on a Unix domain socket.
+    """
+    daemon_threads = True
+
+class PassportServer():
+    """
+    Represents a long-lived passport service. Jobs are accepted over HTTP (TCP or Unix socket)
+    and run on a fixed pool of worker threads, so imports, connection pools and caches stay warm between jobs.
+
+    Endpoints:
+        POST /passports: body {"protein_name", "protein_id", "first_name", "last_name"}; returns the job.
+            With ?wait=1 the response is sent when the job has finished.
+        GET /passports/<job_id>: returns the job.
+        GET /health: returns {"status": "ok"}.
+
+    Attributes:
+        run_job (callable): Builds one passport, run_job(protein_id, protein_name, first_name, last_name) -> output path.
+        jobs (dict): Job records keyed by job ID. Finished jobs are kept for job_ttl seconds, at most max_jobs in total.
+        job_ttl (float): Seconds a finished job stays queryable.
+        max_jobs (int): Job records kept; the oldest finished jobs go first.
+    """
+    REQUIRED_FIELDS = ("protein_name", "protein_id", "first_name", "last_name")
+
+    def __init__(self, run_job, workers: int = 2, job_ttl: float = 24 * 3600, max_jobs: int = 10000):
+        """
+        Constructor for PassportServer.
+
+        Args:
+            run_job (callable): Builds one passport and returns its output path.
+            workers (int): Number of jobs run concurrently.
+            job_ttl (float): Seconds a finished job stays queryable.
+            max_jobs (int): Job records kept.
+        """
+        self.run_job = run_job
+        self.job_ttl = job_ttl
+        self.max_jobs = max_jobs
+        self.jobs = {}
+        self._futures = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(self, payload: dict) -> dict:
+        """
+        Queues a passport job.
+
+        Args:
+            payload (dict): Job fields (see REQUIRED_FIELDS).
+
+        Returns:
+            dict: Job record.
+        """
+        if not isinstance(payload, dict):
+            raise ValueError("Expected a JSON object")
+        missing = [f for f in self.REQUIRED_FIELDS if not payload.get(f)]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "status": "queued", "submitted": time(), "output_path": None, "error": None,
+               **{f: payload[f] for f in self.REQUIRED_FIELDS}}
+        with self._lock:
+            self._evict()
+            self.jobs[job_id] = job
+            self._futures[job_id] = self._executor.submit(self._run, job)
+        return dict(job)
+
+    def _evict(self):
+        """
+        Drops finished jobs older than job_ttl, then the oldest finished jobs beyond max_jobs. Call with the lock held.
+        """
+        finished = sorted((job["finished"], job_id) for job_id, job in self.jobs.items() if "finished" in job)
+        expired = [job_id for finished_at, job_id in finished if finished_at < time() - self.job_ttl]
+        excess = max(0, len(self.jobs) - len(expired) - self.max_jobs + 1)
+        for job_id in expired + [job_id for _, job_id in finished[len(expired):len(expired) + excess]]:
+            del self.jobs[job_id]
+            self._futures.pop(job_id, None)
+
+    def wait(self, job_id: str) -> dict | None:
+        """
+        Blocks until a job has finished.
+
+        Args:
+            job_id (str): Job ID.
+
+        Returns:
+            dict: Job record, or None if unknown.
+        """
+        with self._lock:
+            future, job = self._futures.get(job_id), self.jobs.get(job_id)
+        if future is None:
+            return None
+        future.result()
+        return dict(job)
+
+    def status(self, job_id: str) -> dict | None:
+        """
+        Gets a job record.
+
+        Args:
+            job_id (str): Job ID.
+
+        Returns:
+            dict: Job record, or None if unknown.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, job: dict):
+        """
+        Runs a queued job and records its outcome.
+
+        Args:
+            job (dict): Job record.
+        """
+        job["status"] = "running"
+        job["started"] = time()
+        try:
+            job["output_path"] = str(self.run_job(job["protein_id"], job["protein_name"], job["first_name"], job["last_name"]))
+            job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = f"{type(e).__name__}: {e}"
+        job["finished"] = time()
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765, socket_path: str | None = None):
+        """
+        Serves the HTTP API until interrupted.
+
+        Args:
+            host (str): TCP host to bind.
+            port (int): TCP port to bind.
+            socket_path (str): Unix socket path to bind instead of TCP.
+        """
+        handler = _make_handler(self)
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            httpd = _UnixHTTPServer(socket_path, handler)
+            print(f"Serving passports on unix:{socket_path}")
+        else:
+            httpd = ThreadingHTTPServer((host, port), handler)
+            print(f"Serving passports on http://{host}:{port}")
+
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+def _make_handler(server: PassportServer):
+    """
+    Builds the request handler class bound to a PassportServer.
+
+    Args:
+        server (PassportServer): Server whose jobs are exposed.
+
+    Returns:
+        type: BaseHTTPRequestHandler subclass.
+    """
+    class Handler(BaseHTTPRequestHandler):
+
+        def address_string(self):
+            # Unix socket peers have no (host, port) address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def _reply(self, code: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/health":
+                return self._reply(200, {"status": "ok"})
+            if path.startswith("/passports/"):
+                job = server.status(path.rsplit("/", 1)[-1])
+                return self._reply(200, job) if job else self._reply(404, {"error": "Unknown job"})
+            self._reply(404, {"error": "Not found"})
+
+        def do_POST(self):
+            path, _, query = self.path.partition("?")
+            if path.rstrip("/") != "/passports":
+                return self._reply(404, {"error": "Not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                job = server.submit(json.loads(self.rfile.read(length) or b"{}"))
+            except ValueError as e:
+                return self._reply(400, {"error": str(e)})
+
+            if "wait=1" in query.split("&"):
+                job_id, job = job["id"], server.wait(job["id"])
+                if job is None:
+                    # finished and already evicted by later submissions
+                    return self._reply(410, {"error": "Job finished and was evicted", "id": job_id})
+            self._reply(202 if job["status"] in ("queued", "running") else 200, job)
+
+    return Handler
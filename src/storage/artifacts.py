@@ -0,0 +1,198 @@
+import errno, gzip, hashlib, json, os, shutil, tempfile
+from pathlib import Path
+from threading import Lock
+from storage import workspace
+
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+# the umask can only be read by setting it, so it is read once, before any writer threads start
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+class ArtifactStore():
+    """
+    Represents a content-addressed store for sequence, annotation and structure files, shared by all
+    targets and runs under an output root. Each distinct content is stored once, keyed by its SHA-256.
+
+    Without compression, per-protein paths are hardlinks to the stored object, so every reader sees an
+    ordinary file. With gzip or zstd compression, per-protein paths are small JSON manifests
+    (<path>.cas) and readers go through read() or materialize().
+
+    Attributes:
+        root (Path): Store directory.
+        compression (str): "none", "gzip" or "zstd".
+    """
+    root: Path
+    compression: str
+
+    def __init__(self, root, compression: str = "none"):
+        """
+        Constructor for ArtifactStore.
+
+        Args:
+            root (str | Path): Store directory.
+            compression (str): "none", "gzip" or "zstd".
+        """
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression {compression}")
+        self.root = Path(root)
+        self.compression = compression
+
+    def _object_path(self, digest: str, compression: str) -> Path:
+        return self.root / "objects" / digest[:2] / (digest + COMPRESSION_SUFFIXES[compression])
+
+    def put(self, data: bytes) -> str:
+        """
+        Stores content unless it is already present.
+
+        Args:
+            data (bytes): Content.
+
+        Returns:
+            str: SHA-256 hex digest of the content.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest, self.compression)
+        if path.exists():
+            return digest
+
+        if self.compression == "gzip":
+            data = gzip.compress(data, mtime=0)
+        elif self.compression == "zstd":
+            import zstandard
+            data = zstandard.ZstdCompressor().compress(data)
+
+        atomic_write(path, data)
+        return digest
+
+    def write(self, dest, data: bytes) -> str:
+        """
+        Stores content and exposes it at dest (a hardlink, or a manifest when compressed).
+
+        Args:
+            dest (str | Path): Per-protein path.
+            data (bytes): Content.
+
+        Returns:
+            str: SHA-256 hex digest of the content.
+        """
+        dest = Path(dest)
+        digest = self.put(data)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.compression == "none":
+            # a unique name per call, so no two writers ever link or copy through the same temporary file
+            fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.")
+            os.close(fd)
+            os.unlink(tmp)
+            try:
+                os.link(self._object_path(digest, "none"), tmp)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM):
+                    raise
+                # different filesystem or no hardlink support
+                shutil.copyfile(self._object_path(digest, "none"), tmp)
+            os.replace(tmp, dest)
+            stale = _manifest_path(dest)
+        else:
+            atomic_write(_manifest_path(dest), json.dumps({"sha256": digest, "compression": self.compression}).encode())
+            stale = dest
+        # read() prefers the plain file, so the representation of an earlier compression setting must go
+        stale.unlink(missing_ok=True)
+        return digest
+
+    def exists(self, path) -> bool:
+        """
+        Checks whether a per-protein path has been written, as a plain file or a manifest.
+
+        Args:
+            path (str | Path): Per-protein path.
+
+        Returns:
+            bool: True if it exists.
+        """
+        path = Path(path)
+        return path.exists() or _manifest_path(path).exists()
+
+    def read(self, path) -> bytes:
+        """
+        Reads a per-protein path, whether it is a plain file or a manifest.
+
+        Args:
+            path (str | Path): Per-protein path.
+
+        Returns:
+            bytes: Content.
+        """
+        path = Path(path)
+        if path.exists():
+            return path.read_bytes()
+
+        manifest = json.loads(_manifest_path(path).read_text())
+        data = self._object_path(manifest["sha256"], manifest["compression"]).read_bytes()
+        if manifest["compression"] == "gzip":
+            return gzip.decompress(data)
+        if manifest["compression"] == "zstd":
+            import zstandard
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def materialize(self, path) -> str:
+        """
+        Gets a plain file path for external tools (PyMOL, Geneious). Compressed content is decompressed
+        once per digest into the store's plain/ directory, keeping the original file suffix.
+
+        Args:
+            path (str | Path): Per-protein path.
+
+        Returns:
+            str: Readable plain file path.
+        """
+        path = Path(path)
+        if path.exists():
+            return str(path)
+
+        digest = json.loads(_manifest_path(path).read_text())["sha256"]
+        plain = self.root / "plain" / digest[:2] / (digest + path.suffix)
+        if not plain.exists():
+            atomic_write(plain, self.read(path))
+        return str(plain)
+
+def _manifest_path(path: Path) -> Path:
+    return path.with_name(path.name + ".cas")
+
+def atomic_write(path: Path, data: bytes):
+    """
+    Writes a file via a temporary file and rename, so concurrent writers never expose partial content.
+
+    Args:
+        path (Path): Destination.
+        data (bytes): Content.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        # mkstemp creates 0600 files; the store is shared, so objects get the mode the umask gives ordinary files
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+_stores = {}
+_stores_lock = Lock()
+
+def current() -> ArtifactStore:
+    """
+    Gets the artifact store under the current workspace's output root
+    (compression from PASSPORT_STORE_COMPRESSION, default none).
+
+    Returns:
+        ArtifactStore: Current store.
+    """
+    root = workspace.current().root / "artifact_store"
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = ArtifactStore(root, compression=os.environ.get("PASSPORT_STORE_COMPRESSION", "none"))
+        return _stores[root]
@@ -0,0 +1,145 @@
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from time import time
+from storage import database, workspace
+
+COLUMNS = ("run_id", "protein_name", "organism", "accession", "human_accession", "length", "mass", "identity", "rmsd",
+           "pdb_ids", "alphafold_id", "deck_path", "created")
+
+class Catalog():
+    """
+    Represents the results catalog of an output root: one row per target and organism of every run, in an
+    indexed SQLite table next to the decks. Rows are buffered and written batch_size at a time in a single
+    transaction, so workers on several hosts contend for the write lock once per batch rather than per row.
+
+    Like the job queue, the database keeps SQLite's default rollback journal so it works on network filesystems.
+
+    Attributes:
+        path (Path): Database file path.
+        batch_size (int): Buffered rows that trigger a write.
+    """
+    path: Path
+    batch_size: int
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS passports (
+            run_id TEXT NOT NULL,
+            protein_name TEXT NOT NULL,
+            organism TEXT NOT NULL,
+            accession TEXT NOT NULL,
+            human_accession TEXT NOT NULL,
+            length INTEGER,
+            mass REAL,
+            identity REAL,
+            rmsd REAL,
+            pdb_ids TEXT,
+            alphafold_id TEXT,
+            deck_path TEXT,
+            created REAL NOT NULL,
+            PRIMARY KEY (run_id, protein_name, organism)
+        );
+        CREATE INDEX IF NOT EXISTS passports_organism_rmsd ON passports (organism, rmsd);
+        CREATE INDEX IF NOT EXISTS passports_organism_identity ON passports (organism, identity);
+        CREATE INDEX IF NOT EXISTS passports_protein ON passports (protein_name);
+        CREATE INDEX IF NOT EXISTS passports_accession ON passports (accession);
+    """
+
+    def __init__(self, path, batch_size: int = 500):
+        """
+        Constructor for Catalog. Creates the database if needed.
+
+        Args:
+            path (str | Path): Database file path.
+            batch_size (int): Buffered rows that trigger a write.
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._rows = []
+        self._lock = Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            db.executescript(self.SCHEMA)
+        finally:
+            db.close()
+
+    def add(self, rows: list):
+        """
+        Buffers rows, writing the buffer once it holds batch_size rows. A target's rows replace all
+        rows it had earlier in the same run, including those of organisms it no longer has.
+
+        Args:
+            rows (list): Rows of one or more targets, as dicts keyed by column name; created defaults to now.
+        """
+        now = time()
+        targets = {(row.get("run_id"), row.get("protein_name")) for row in rows}
+        with self._lock:
+            self._rows = [row for row in self._rows if row[:2] not in targets]
+            self._rows.extend(tuple(row.get(column, now if column == "created" else None) for column in COLUMNS) for row in rows)
+            full = len(self._rows) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Writes every buffered row in one transaction.
+
+        Returns:
+            int: Number of rows written.
+        """
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            with database.transaction(self.path) as db:
+                db.executemany("DELETE FROM passports WHERE run_id = ? AND protein_name = ?", {row[:2] for row in rows})
+                db.executemany(f"INSERT OR REPLACE INTO passports ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+        return len(rows)
+
+    def query(self, where: str = "1", params: tuple = (), order_by: str = "protein_name, organism", limit: int | None = None) -> list:
+        """
+        Selects catalog rows.
+
+        Args:
+            where (str): SQL condition over the catalog columns, with ? placeholders.
+            params (tuple): Placeholder values.
+            order_by (str): SQL ordering.
+            limit (int): Maximum number of rows.
+
+        Returns:
+            list: Row dicts.
+        """
+        sql = f"SELECT {', '.join(COLUMNS)} FROM passports WHERE {where} ORDER BY {order_by}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        db = sqlite3.connect(self.path, timeout=60)
+        db.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in db.execute(sql, params)]
+        finally:
+            db.close()
+
+_catalogs = {}
+_catalogs_lock = Lock()
+
+def current() -> Catalog:
+    """
+    Gets the catalog of the current workspace's output root, shared by every run under it.
+
+    Returns:
+        Catalog: Current catalog.
+    """
+    path = workspace.current().root / "passport_catalog.db"
+    with _catalogs_lock:
+        if path not in _catalogs:
+            _catalogs[path] = Catalog(path)
+        return _catalogs[path]
+
+def flush_all():
+    """
+    Writes the buffered rows of every catalog opened by this process.
+    """
+    with _catalogs_lock:
+        catalogs = list(_catalogs.values())
+    for catalog in catalogs:
+        catalog.flush()
@@ -0,0 +1,26 @@
+import sqlite3
+from contextlib import contextmanager
+
+@contextmanager
+def transaction(path):
+    """
+    Opens a connection to a SQLite database holding its write lock for the duration of the block.
+    Shared by the job queue and the results catalog, which both keep the default rollback journal.
+
+    Args:
+        path (str | Path): Database file path.
+
+    Yields:
+        sqlite3.Connection: Connection inside an immediate transaction.
+    """
+    db = sqlite3.connect(path, timeout=60, isolation_level=None)
+    db.row_factory = sqlite3.Row
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        yield db
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,202 @@
+import json, sqlite3
+from pathlib import Path
+from time import time
+from storage import database
+
+class JobQueue():
+    """
+    Represents a durable passport job queue in SQLite. Workers claim jobs under a time-limited lease,
+    so a job whose worker dies is picked up again once its lease expires. Failed jobs are retried with
+    exponential backoff until max_attempts is reached.
+
+    The database uses SQLite's default rollback journal rather than WAL, because WAL needs shared memory
+    and does not work for workers on several hosts sharing a network filesystem.
+
+    Attributes:
+        path (Path): Database file path.
+        max_attempts (int): Attempts before a job is marked failed.
+        backoff (float): Base retry delay in seconds, doubled per attempt.
+    """
+    path: Path
+    max_attempts: int
+    backoff: float
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            protein_name TEXT NOT NULL,
+            protein_id TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires REAL,
+            available_at REAL NOT NULL DEFAULT 0,
+            error TEXT,
+            timings TEXT,
+            output_path TEXT,
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            UNIQUE (protein_name, protein_id)
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at);
+    """
+
+    def __init__(self, path, max_attempts: int = 3, backoff: float = 30.0):
+        """
+        Constructor for JobQueue. Creates the database if needed.
+
+        Args:
+            path (str | Path): Database file path.
+            max_attempts (int): Attempts before a job is marked failed.
+            backoff (float): Base retry delay in seconds.
+        """
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            db.executescript(self.SCHEMA)
+        finally:
+            db.close()
+
+    def enqueue(self, targets: list) -> int:
+        """
+        Adds jobs; targets already in the queue are skipped.
+
+        Args:
+            targets (list): (protein_name, protein_id) pairs.
+
+        Returns:
+            int: Number of new jobs.
+        """
+        now = time()
+        with database.transaction(self.path) as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO jobs (protein_name, protein_id, created, updated) VALUES (?, ?, ?, ?)",
+                           [(name, pid, now, now) for name, pid in targets])
+            return db.total_changes - before
+
+    def claim(self, worker: str, lease: float = 1800) -> dict | None:
+        """
+        Claims the next available job: a pending job past its backoff, or a running job whose lease expired.
+        Jobs whose lease expired on their last attempt, e.g. because they keep killing their worker, are marked failed.
+
+        Args:
+            worker (str): Worker ID.
+            lease (float): Lease duration in seconds.
+
+        Returns:
+            dict: Claimed job, or None if nothing is available.
+        """
+        now = time()
+        with database.transaction(self.path) as db:
+            db.execute("""UPDATE jobs SET status = 'failed', error = 'lease expired: worker died or stopped renewing on attempt ' || attempts,
+                          lease_owner = NULL, updated = ?
+                          WHERE status = 'running' AND lease_expires < ? AND attempts >= ?""", (now, now, self.max_attempts))
+            row = db.execute("""SELECT * FROM jobs
+                                WHERE (status = 'pending' AND available_at <= ?) OR (status = 'running' AND lease_expires < ?)
+                                ORDER BY id LIMIT 1""", (now, now)).fetchone()
+            if row is None:
+                return None
+            db.execute("""UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated = ?
+                          WHERE id = ?""", (worker, now + lease, now, row["id"]))
+            job = dict(row)
+            job["attempts"] += 1
+            return job
+
+    def renew(self, job_id: int, worker: str, lease: float = 1800) -> bool:
+        """
+        Extends the lease of a claimed job.
+
+        Args:
+            job_id (int): Job ID.
+            worker (str): Worker ID holding the lease.
+            lease (float): New lease duration in seconds.
+
+        Returns:
+            bool: False if the lease was lost to another worker.
+        """
+        with database.transaction(self.path) as db:
+            cursor = db.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                                (time() + lease, job_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, output_path: str, timings: dict, errors: list | None = None):
+        """
+        Marks a claimed job done, or degraded if its passport was built without some parts.
+
+        Args:
+            job_id (int): Job ID.
+            worker (str): Worker ID holding the lease.
+            output_path (str): Passport output path.
+            timings (dict): Seconds spent per stage.
+            errors (list): Failures the passport was built without, stored as the job's error.
+
+        Returns:
+            bool: False if the lease was lost to another worker, leaving the job untouched.
+        """
+        with database.transaction(self.path) as db:
+            cursor = db.execute("""UPDATE jobs SET status = ?, output_path = ?, timings = ?, error = ?, lease_owner = NULL, updated = ?
+                                   WHERE id = ? AND lease_owner = ? AND status = 'running'""", 
+                                ("degraded" if errors else "done", str(output_path), json.dumps(timings), 
+                                 json.dumps(errors) if errors else None, time(), job_id, worker))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str, timings: dict):
+        """
+        Records a failed attempt. The job is rescheduled with backoff, or marked failed after max_attempts.
+
+        Args:
+            job_id (int): Job ID.
+            worker (str): Worker ID holding the lease.
+            error (str): Error description.
+            timings (dict): Seconds spent per completed stage.
+        """
+        now = time()
+        with database.transaction(self.path) as db:
+            row = db.execute("SELECT attempts FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'running'", (job_id, worker)).fetchone()
+            if row is None:
+                return
+            retry = row["attempts"] < self.max_attempts
+            db.execute("""UPDATE jobs SET status = ?, available_at = ?, error = ?, timings = ?, lease_owner = NULL, updated = ?
+                          WHERE id = ?""", ("pending" if retry else "failed", now + self.backoff * 2 ** (row["attempts"] - 1),
+                                            error, json.dumps(timings), now, job_id))
+
+    def retry_failed(self) -> int:
+        """
+        Puts every failed job back in the queue with a fresh attempt count.
+
+        Returns:
+            int: Number of jobs requeued.
+        """
+        with database.transaction(self.path) as db:
+            cursor = db.execute("UPDATE jobs SET status = 'pending', attempts = 0, available_at = 0, updated = ? WHERE status = 'failed'",
+                                (time(),))
+            return cursor.rowcount
+
+    def counts(self) -> dict:
+        """
+        Counts jobs per status.
+
+        Returns:
+            dict: Job count keyed by status.
+        """
+        with database.transaction(self.path) as db:
+            return {row["status"]: row["n"] for row in db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+
+    def jobs(self, status: str | None = None) -> list:
+        """
+        Lists jobs, optionally with a given status.
+
+        Args:
+            status (str): Status to filter on.
+
+        Returns:
+            list: Job dicts.
+        """
+        with database.transaction(self.path) as db:
+            if status:
+                rows = db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,))
+            else:
+                rows = db.execute("SELECT * FROM jobs ORDER BY id")
+            return [dict(row) for row in rows]
@@ -0,0 +1,121 @@
+from datetime import date
+from models.annotation import Annotation
+
+# GenPept feature keys and names of the passport annotations
+FEATURES = {
+    Annotation.CHAIN: ("Region", "Chain"),
+    Annotation.ECD: ("Region", "Extracellular"),
+    Annotation.CYTO: ("Region", "Cytoplasmic"),
+    Annotation.TM: ("Region", "Transmembrane"),
+    Annotation.SIGNAL: ("sig_peptide", "Signal peptide"),
+}
+QUALIFIER_INDENT = " " * 21
+
+def _location(start, end) -> str:
+    start, end = int(start), int(end)
+    return str(start) if start == end else f"{start}..{end}"
+
+def genbank_record(protein, record_date: date | None = None) -> str:
+    """
+    Builds an annotated GenBank (GenPept) record of a protein from its sequence and parsed annotations.
+
+    Args:
+        protein (Protein): Protein to export.
+        record_date (date): Date on the LOCUS line (defaults to today).
+
+    Returns:
+        str: GenBank record, terminated by "//".
+    """
+    sequence = protein.sequence
+    stamp = (record_date or date.today()).strftime("%d-%b-%Y").upper()
+    organism = protein.organism.display_name
+
+    lines = [
+        f"LOCUS       {protein.id:<16} {len(sequence):>11} aa            linear   UNA {stamp}",
+        f"DEFINITION  {protein.name} ({protein.organism.name.capitalize()}).",
+        f"ACCESSION   {protein.id}",
+        f"SOURCE      {organism}",
+        f"  ORGANISM  {organism}",
+        "FEATURES             Location/Qualifiers",
+        f"     {'source':<16}1..{len(sequence)}",
+        f'{QUALIFIER_INDENT}/organism="{organism}"',
+        f'{QUALIFIER_INDENT}/db_xref="taxon:{protein.organism.taxon_id}"',
+    ]
+
+    annotations = protein.annotations
+    # features in location order, as GenBank readers expect
+    features = sorted(((int(start), int(end), annotation) for annotation in FEATURES for start, end in annotations.get(annotation, [])),
+                      key=lambda feature: feature[:2])
+    for start, end, annotation in features:
+        key, name = FEATURES[annotation]
+        lines.append(f"     {key:<16}{_location(start, end)}")
+        if key == "Region":
+            lines.append(f'{QUALIFIER_INDENT}/region_name="{name}"')
+        lines.append(f'{QUALIFIER_INDENT}/label="{name}"')
+        lines.append(f'{QUALIFIER_INDENT}/note="color: {annotation.color}"')
+
+    lines.append("ORIGIN")
+    residues = sequence.lower()
+    for offset in range(0, len(residues), 60):
+        chunk = residues[offset:offset + 60]
+        lines.append(f"{offset + 1:>9} " + " ".join(chunk[i:i + 10] for i in range(0, len(chunk), 10)))
+    lines.append("//")
+    return "\n".join(lines) + "\n"
+
+def write_genbank(proteins, fh, record_date: date | None = None) -> int:
+    """
+    Streams GenBank records to an open text file, one protein at a time.
+
+    Args:
+        proteins (iterable): Proteins to export.
+        fh (TextIO): Output file.
+        record_date (date): Date on the LOCUS lines (defaults to today).
+
+    Returns:
+        int: Number of records written.
+    """
+    count = 0
+    for protein in proteins:
+        fh.write(genbank_record(protein, record_date))
+        count += 1
+    return count
+
+def gff3_lines(protein):
+    """
+    Yields the GFF3 feature lines of a protein's parsed annotations.
+
+    Args:
+        protein (Protein): Protein to export.
+
+    Yields:
+        str: GFF3 feature line.
+    """
+    for annotation, (_, name) in FEATURES.items():
+        for start, end in sorted(protein.annotations.get(annotation, []), key=lambda span: int(span[0])):
+            yield "\t".join([protein.id, "UniProtKB", annotation.feature, str(int(start)), str(int(end)), ".", ".", ".",
+                             f"Name={name};color={annotation.color}"])
+
+def write_gff3_bundle(proteins: list, fh) -> int:
+    """
+    Writes proteins as one GFF3 file with an embedded ##FASTA section. Features of every protein are
+    streamed first and the sequences after them, as the format requires.
+
+    Args:
+        proteins (list): Proteins to export.
+        fh (TextIO): Output file.
+
+    Returns:
+        int: Number of proteins written.
+    """
+    fh.write("##gff-version 3\n")
+    for protein in proteins:
+        fh.write(f"##sequence-region {protein.id} 1 {len(protein.sequence)}\n")
+        for line in gff3_lines(protein):
+            fh.write(line + "\n")
+
+    fh.write("##FASTA\n")
+    for protein in proteins:
+        sequence = protein.sequence
+        fh.write(f">{protein.id} {protein.name} {protein.organism.display_name}\n")
+        fh.write("\n".join(sequence[i:i + 60] for i in range(0, len(sequence), 60)) + "\n")
+    return len(proteins)
@@ -0,0 +1,148 @@
+import json, os
+from dataclasses import dataclass
+from pathlib import Path
+
+@dataclass
+class Workspace:
+    """
+    Represents where a run writes its outputs. Without a run ID, targets are written to
+    <root>/output_<name> as before; with one, every target of the run is isolated under <root>/<run_id>/.
+
+    Attributes:
+        root (Path): Output root (PASSPORT_OUTPUT_ROOT, default the project root).
+        run_id (str): Run ID, or None for the shared legacy layout.
+    """
+    root: Path
+    run_id: str | None = None
+
+    @property
+    def run_dir(self) -> Path:
+        return self.root / self.run_id if self.run_id else self.root
+
+    def target_dir(self, protein_name: str) -> Path:
+        """
+        Gets the output directory of a target.
+
+        Args:
+            protein_name (str): Name of the target protein.
+
+        Returns:
+            Path: Target output directory.
+        """
+        return self.run_dir / f"output_{protein_name}"
+
+    def write_shard_summary(self, shard: tuple, results: list) -> Path:
+        """
+        Writes the summary of one shard of this run.
+
+        Args:
+            shard (tuple): (index, count) of the shard, 1-based.
+            results (list): Per-target result dicts.
+
+        Returns:
+            Path: Summary file path.
+        """
+        path = self.run_dir / f"summary_shard_{shard[0]}_of_{shard[1]}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"shard": list(shard), "results": results}, indent=2))
+        return path
+
+    def failure_report_path(self, stage: str, shard: tuple | None = None) -> Path:
+        """
+        Gets the failure report path of one stage of this run (or of one shard of it). Every stage has its own
+        report, so a clean later stage does not remove the report of an earlier one.
+
+        Args:
+            stage (str): Stage name.
+            shard (tuple): (index, count) of the shard, 1-based, or None.
+
+        Returns:
+            Path: Report file path.
+        """
+        name = f"{stage}_shard_{shard[0]}_of_{shard[1]}.json" if shard else f"{stage}.json"
+        return self.run_dir / "failure_reports" / name
+
+    def write_failure_report(self, results: list, stage: str, shard: tuple | None = None) -> Path | None:
+        """
+        Writes the failed and degraded targets of one stage of this run (or of one shard of it).
+
+        Args:
+            results (list): Per-target result dicts with status and errors.
+            stage (str): Stage the results are from.
+            shard (tuple): (index, count) of the shard, 1-based, or None.
+
+        Returns:
+            Path: Report file path, or None if every target succeeded completely (an earlier report is removed).
+        """
+        failures = [result for result in results if result["status"] != "done"]
+        path = self.failure_report_path(stage, shard)
+        if not failures:
+            # a rerun of the same stage must not leave the report of an earlier attempt behind
+            path.unlink(missing_ok=True)
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(failures, indent=2))
+        return path
+
+    def merge_shard_summaries(self) -> dict:
+        """
+        Combines every shard summary of this run into summary.json.
+
+        Returns:
+            dict: Merged summary with the shards found and all results.
+        """
+        shards, results = [], []
+        for path in sorted(self.run_dir.glob("summary_shard_*_of_*.json")):
+            summary = json.loads(path.read_text())
+            shards.append(summary["shard"])
+            results.extend(summary["results"])
+
+        if not shards:
+            raise FileNotFoundError(f"No shard summaries in {self.run_dir}")
+
+        merged = {"run_id": self.run_id, "shards": shards, "results": results}
+        (self.run_dir / "summary.json").write_text(json.dumps(merged, indent=2))
+        return merged
+
+_current = Workspace(root=Path(os.environ.get("PASSPORT_OUTPUT_ROOT", Path(__file__).parent.parent.parent)))
+
+def current() -> Workspace:
+    """
+    Gets the workspace of this process.
+
+    Returns:
+        Workspace: Current workspace.
+    """
+    return _current
+
+def configure(root=None, run_id: str | None = None) -> Workspace:
+    """
+    Sets the workspace of this process.
+
+    Args:
+        root (str | Path): Output root, or None to keep the current one.
+        run_id (str): Run ID, or None for the legacy layout.
+
+    Returns:
+        Workspace: New current workspace.
+    """
+    global _current
+    _current = Workspace(root=Path(root) if root else _current.root, run_id=run_id)
+    return _current
+
+def shard_targets(targets: list, shard: tuple) -> list:
+    """
+    Deterministically selects one shard of a target list: every count-th target starting at index.
+    Every node given the same list and count gets a disjoint, balanced share.
+
+    Args:
+        targets (list): (protein_name, protein_id) pairs in CSV order.
+        shard (tuple): (index, count) of the shard, 1-based.
+
+    Returns:
+        list: Targets of the shard.
+    """
+    index, count = shard
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard {index}/{count} is out of range")
+    return targets[index - 1::count]
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the modules are imported from src/ the way main.py runs them
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
@@ -0,0 +1,79 @@
+import json
+import pytest
+from storage import job_queue
+from storage.job_queue import JobQueue
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue, "time", clock)
+    return clock
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = JobQueue(tmp_path / "queue.db", max_attempts=2, backoff=10)
+    queue.enqueue([("TP53", "P04637"), ("EGFR", "P00533")])
+    return queue
+
+def test_enqueue_skips_known_targets(queue):
+    assert queue.enqueue([("TP53", "P04637"), ("KRAS", "P01116")]) == 1
+    assert queue.counts() == {"pending": 3}
+
+def test_claims_jobs_in_order_once(queue):
+    first, second = queue.claim("w1", lease=60), queue.claim("w2", lease=60)
+
+    assert (first["protein_name"], second["protein_name"]) == ("TP53", "EGFR")
+    assert queue.claim("w3", lease=60) is None
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    job = queue.claim("w1", lease=60)
+    queue.claim("w1", lease=60)
+
+    clock.now += 30
+    assert queue.renew(job["id"], "w1", lease=60)
+    clock.now += 61
+    reclaimed = queue.claim("w2", lease=60)
+
+    assert reclaimed["id"] == job["id"] and reclaimed["attempts"] == 2
+    assert not queue.renew(job["id"], "w1", lease=60)
+    assert not queue.complete(job["id"], "w1", "/old.pptx", {})
+    assert queue.complete(job["id"], "w2", "/new.pptx", {})
+
+def test_lease_expired_on_last_attempt_fails_job(queue, clock):
+    job = queue.claim("w1", lease=60)
+    clock.now += 61
+    queue.claim("w2", lease=60)
+    clock.now += 61
+
+    assert queue.claim("w3", lease=60)["id"] != job["id"]
+    failed, = queue.jobs("failed")
+    assert failed["id"] == job["id"] and failed["error"].startswith("lease expired")
+
+def test_failed_attempt_backs_off_then_fails(queue, clock):
+    job = queue.claim("w1", lease=60)
+    queue.fail(job["id"], "w1", "boom", {})
+    other = queue.claim("w1", lease=60)
+
+    assert other["id"] != job["id"]
+    clock.now += 10
+    retry = queue.claim("w1", lease=60)
+    assert retry["id"] == job["id"]
+    queue.fail(job["id"], "w1", "boom again", {})
+    assert [j["error"] for j in queue.jobs("failed")] == ["boom again"]
+    assert queue.retry_failed() == 1
+
+def test_degraded_completion_keeps_errors(queue):
+    job = queue.claim("w1", lease=60)
+    errors = [{"stage": "align", "organism": "MOUSE", "error": "RuntimeError: no model"}]
+
+    assert queue.complete(job["id"], "w1", "/deck.pptx", {"fetch": 1.0}, errors)
+
+    degraded, = queue.jobs("degraded")
+    assert json.loads(degraded["error"]) == errors
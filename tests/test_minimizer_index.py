@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from analysis import minimizer_index
+from analysis.minimizer_index import K, WINDOW, MinimizerIndex, minimizers
+from analysis.msa import ALPHABET, encode
+
+def brute_force_minimizers(sequence, k=K, window=WINDOW):
+    """
+    Minimizer positions by scanning every window: the first k-mer of lowest hash, skipping k-mers with unknown residues.
+    """
+    hashes = []
+    for start in range(len(sequence) - k + 1):
+        kmer = sequence[start:start + k]
+        if any(aa not in ALPHABET for aa in kmer):
+            hashes.append(None)
+            continue
+        value = sum(ALPHABET.index(aa) * len(ALPHABET) ** (k - 1 - t) for t, aa in enumerate(kmer))
+        hashes.append((value * 0x9E3779B1) & 0xFFFFFFFF)
+
+    positions = set()
+    for start in range(len(hashes) - window + 1):
+        valid = [(h, start + t) for t, h in enumerate(hashes[start:start + window]) if h is not None]
+        if valid:
+            positions.add(min(valid)[1])
+    return {position: hashes[position] for position in positions}
+
+def kmers(sequence, k=K):
+    return {sequence[i:i + k] for i in range(len(sequence) - k + 1)}
+
+def random_sequence(rng, length):
+    return "".join(rng.choice(list(ALPHABET), length))
+
+def mutate(rng, sequence, rate):
+    return "".join(rng.choice(list(ALPHABET)) if rng.random() < rate else aa for aa in sequence)
+
+@pytest.mark.parametrize("sequence", ["MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQVKVKALPDAQ",
+                                      "MKTAYIAKQRXXISFVKSHFSRQLEEBLGLIEV", "MKTAYIAKQR", "MKTA"])
+def test_minimizers_match_window_scan(sequence):
+    hashes, positions = minimizers(encode(sequence))
+
+    assert dict(zip(positions.tolist(), hashes.tolist())) == brute_force_minimizers(sequence)
+
+@pytest.fixture(scope="module")
+def proteome():
+    rng = np.random.default_rng(7)
+    query = random_sequence(rng, 400)
+    homologs = {f"H{int(rate * 100)}": mutate(rng, query, rate) for rate in (0.02, 0.08, 0.15, 0.3)}
+    records = [(f"R{i}", random_sequence(rng, rng.integers(50, 600))) for i in range(300)]
+    records[::75] = list(homologs.items())
+    return (query, records, MinimizerIndex.build(records))
+
+def test_candidates_follow_kmer_overlap(proteome):
+    query, records, index = proteome
+    sequences = dict(records)
+    query_kmers = kmers(query)
+    overlap = {accession: len(query_kmers & kmers(sequence)) / len(query_kmers) for accession, sequence in records}
+    expected = [accession for accession, shared in sorted(overlap.items(), key=lambda x: x[1], reverse=True) if shared > 0.1]
+
+    candidates = index.candidates(query, top=len(expected))
+
+    assert [accession for accession, _, _ in candidates] == expected
+    for accession, i, _ in candidates:
+        assert index.sequence(i) == sequences[accession]
+
+def test_identical_sequence_shares_every_minimizer(proteome):
+    _, records, index = proteome
+    accession, sequence = records[1]
+
+    best = index.candidates(sequence, top=1)[0]
+
+    assert best[0] == accession and best[2] == 1.0
+
+def test_rank_orders_by_alignment_identity(proteome):
+    query, _, index = proteome
+
+    ranked = index.rank(query, top=3)
+
+    assert [accession for accession, _, _ in ranked] == ["H2", "H8", "H15"]
+    assert ranked[0][1] > ranked[1][1] > ranked[2][1]
+
+def test_save_and_load_round_trip(proteome, tmp_path):
+    query, _, index = proteome
+
+    index.save(tmp_path)
+    loaded = MinimizerIndex.load(tmp_path)
+
+    assert loaded.candidates(query) == index.candidates(query)
+
+def test_read_fasta_takes_uniprot_accessions(tmp_path):
+    fasta = tmp_path / "proteome.fasta"
+    fasta.write_text(">sp|P12345|TEST_MOUSE Test protein\nMKTA\nYIAK\n>plain description\nMQR\n")
+
+    assert list(minimizer_index.read_fasta(fasta)) == [("P12345", "MKTAYIAK"), ("plain", "MQR")]
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from analysis import msa
+
+def reference_score(a, b, o=msa.GAP_OPEN, e=msa.GAP_EXTEND):
+    """
+    Optimal global alignment score of two profiles with a cell-by-cell Gotoh DP.
+    """
+    n, m = a.shape[0], b.shape[0]
+    neg = float("-inf")
+    h = [[neg] * (m + 1) for _ in range(n + 1)]
+    up = [[neg] * (m + 1) for _ in range(n + 1)]
+    left = [[neg] * (m + 1) for _ in range(n + 1)]
+    h[0][0] = 0.0
+    for i in range(1, n + 1):
+        h[i][0] = up[i][0] = -(o + (i - 1) * e)
+    for j in range(1, m + 1):
+        h[0][j] = left[0][j] = -(o + (j - 1) * e)
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            up[i][j] = max(h[i - 1][j] - o, up[i - 1][j] - e)
+            left[i][j] = max(h[i][j - 1] - o, left[i][j - 1] - e)
+            h[i][j] = max(h[i - 1][j - 1] + float(a[i - 1] @ msa.SCORES @ b[j - 1]), up[i][j], left[i][j])
+    return h[n][m]
+
+def path_score(a, b, cols_a, cols_b, o=msa.GAP_OPEN, e=msa.GAP_EXTEND):
+    """
+    Score of an alignment path: column scores plus affine costs of every gap run of either side.
+    """
+    score, previous = 0.0, None
+    for i, j in zip(cols_a, cols_b):
+        kind = "a" if j < 0 else "b" if i < 0 else None
+        if kind is None:
+            score += float(a[i] @ msa.SCORES @ b[j])
+        else:
+            score -= e if kind == previous else o
+        previous = kind
+    return score
+
+def random_profile(rng, rows, length, gap_rate=0.2):
+    codes = rng.integers(0, 21, size=(rows, length)).astype(np.uint8)
+    codes[rng.random(codes.shape) < gap_rate] = msa._GAP
+    return msa.profile(codes)
+
+@pytest.mark.parametrize("seed", range(12))
+def test_align_profiles_is_optimal(seed):
+    rng = np.random.default_rng(seed)
+    a = random_profile(rng, rng.integers(1, 4), rng.integers(1, 25))
+    b = random_profile(rng, rng.integers(1, 4), rng.integers(1, 25))
+
+    cols_a, cols_b = msa.align_profiles(a, b)
+
+    assert list(cols_a[cols_a >= 0]) == list(range(a.shape[0]))
+    assert list(cols_b[cols_b >= 0]) == list(range(b.shape[0]))
+    assert not ((cols_a < 0) & (cols_b < 0)).any()
+    assert path_score(a, b, cols_a, cols_b) == pytest.approx(reference_score(a, b))
+
+def test_align_profiles_keeps_gaps_in_one_run():
+    a = msa.profile(msa.encode("MKTAYIAKQRQISFVKSHFSRQ")[None, :])
+    b = msa.profile(msa.encode("MKTAYIAKQRFVKSHFSRQ")[None, :])
+
+    cols_a, cols_b = msa.align_profiles(a, b)
+
+    gaps = np.flatnonzero(cols_b < 0)
+    assert gaps.size == 3 and np.ptp(gaps) == 2
+
+def test_pairwise_identity():
+    assert msa.pairwise_identity("MKTAYIAKQR", "MKTAYIAKQR") == 1.0
+    assert msa.pairwise_identity("MKTAYIAKQR", "") == 0.0
+    assert msa.pairwise_identity("MKTAYIAKQR", "MKTAYLAKQR") == pytest.approx(0.9)
+
+def test_guide_tree_merges_closest_clusters_first():
+    distances = np.array([[0, 1, 10, 10],
+                          [1, 0, 10, 10],
+                          [10, 10, 0, 2],
+                          [10, 10, 2, 0]], dtype=float)
+
+    assert msa.guide_tree(distances) == [(0, 1), (2, 3), (4, 5)]
+
+def test_guide_tree_averages_merged_distances():
+    # after 0 and 1 merge, 2 is (3 + 8) / 2 = 5.5 from them on average, so 2 and 3 (at 5) merge next;
+    # single linkage would join 2 to the pair at 3 instead
+    distances = np.array([[0, 1, 3, 9],
+                          [1, 0, 8, 9],
+                          [3, 8, 0, 5],
+                          [9, 9, 5, 0]], dtype=float)
+
+    assert msa.guide_tree(distances) == [(0, 1), (2, 3), (4, 5)]
+
+def test_align_keeps_sequences_and_input_order():
+    sequences = ["MKTAYIAKQRQISFVKSHFSRQ", "MKTAYIAKQRFVKSHFSRQ", "MKSAYIAKQRQISFVKSHF", "MTAYIAKQRQISFVKSHFSRQLE"]
+
+    alignment = msa.align(["a", "b", "c", "d"], sequences, max_workers=1)
+
+    assert [s.replace("-", "") for s in alignment.sequences] == sequences
+    assert len({len(s) for s in alignment.sequences}) == 1
+    assert alignment.identity(0, 0) == 1.0
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from analysis.plddt import CropSettings, confident_segments, crop_pdb, intersect, read_plddt
+
+def segments(plddt, first=1, **settings):
+    residues = np.arange(first, first + len(plddt), dtype=np.int32)
+    return confident_segments(residues, np.asarray(plddt, dtype=np.float32), CropSettings(**settings)).tolist()
+
+def test_no_residues():
+    assert segments([]) == []
+
+def test_nothing_confident():
+    assert segments([50] * 30) == []
+
+def test_everything_confident():
+    assert segments([90] * 30) == [[1, 30]]
+
+def test_threshold_is_inclusive():
+    assert segments([70] * 10 + [69.9] * 10, min_length=10) == [[1, 10]]
+
+def test_runs_at_both_ends():
+    assert segments([90] * 12 + [10] * 20 + [90] * 12) == [[1, 12], [33, 44]]
+
+def test_gap_up_to_max_gap_is_bridged():
+    assert segments([90] * 10 + [10] * 5 + [90] * 10, max_gap=5) == [[1, 25]]
+
+def test_gap_longer_than_max_gap_splits():
+    assert segments([90] * 10 + [10] * 6 + [90] * 10, max_gap=5) == [[1, 10], [17, 26]]
+
+def test_max_gap_zero_never_bridges():
+    assert segments([90] * 10 + [10] + [90] * 10, max_gap=0) == [[1, 10], [12, 21]]
+
+def test_bridging_chains_over_several_gaps():
+    assert segments([90] * 4 + [10] * 2 + [90] * 4 + [10] * 2 + [90] * 4, min_length=10, max_gap=2) == [[1, 16]]
+
+def test_short_runs_are_dropped():
+    assert segments([90] * 9 + [10] * 20 + [90] * 10, min_length=10) == [[30, 39]]
+
+def test_residue_numbers_not_starting_at_one():
+    assert segments([10] * 3 + [90] * 10, first=25) == [[28, 37]]
+
+def test_intersect_with_domains():
+    confident = np.array([[1, 20], [40, 60]], dtype=np.int32)
+
+    assert intersect(confident, [(10, 45)]).tolist() == [[10, 20], [40, 45]]
+    assert intersect(confident, [(25, 35)]).tolist() == []
+    assert intersect(confident, []).tolist() == confident.tolist()
+
+def atom(serial, residue, plddt, name="CA", record="ATOM  "):
+    return f"{record}{serial:>5} {name:<4} ALA A{residue:>4}    {0:>8.3f}{0:>8.3f}{0:>8.3f}{1:>6.2f}{plddt:>6.2f}           C".encode()
+
+def test_read_and_crop_pdb():
+    pdb = b"\n".join([b"HEADER    TEST", atom(1, 1, 95.0), atom(2, 1, 95.0, name="CB"), atom(3, 2, 40.0), atom(4, 3, 80.5),
+                      b"TER       5      ALA A   3", b"END"])
+
+    residues, plddt = read_plddt(pdb)
+    cropped = crop_pdb(pdb, np.array([[1, 1], [3, 3]])).split(b"\n")
+
+    assert residues.tolist() == [1, 2, 3]
+    assert plddt.tolist() == pytest.approx([95.0, 40.0, 80.5])
+    assert cropped == [b"HEADER    TEST", atom(1, 1, 95.0), atom(2, 1, 95.0, name="CB"), atom(4, 3, 80.5), b"END"]